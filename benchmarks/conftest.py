@@ -0,0 +1,161 @@
+"""
+Fixtures for the benchmark suite.
+
+Run with `pytest --no-cov benchmarks` (the path goes last, since the `--cov`
+option from the configuration would take it as its value). Pass
+`--scales=1,10,100` to repeat the benchmarks on corpora scaled by the given
+factors. Timings are handled by
+pytest-benchmark, so regressions are caught with its own options, e.g.
+`--benchmark-autosave` once and `--benchmark-compare
+--benchmark-compare-fail=mean:10%` afterwards. Peak memory is stored with
+`--memory-save=FILE` and checked with `--memory-baseline=FILE`, failing each
+benchmark whose peak exceeds the baseline by more than `--memory-tolerance`.
+"""
+import json
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+from poepy.poepy import poepy_path
+
+LYRICS = ['borges.txt', 'dylan.txt', 'eichendorff.txt', 'eminem.txt',
+          'leto.txt', 'mey.txt', 'miguel.txt', 'moustaki.txt',
+          'rodriguez.txt', 'yueliang.txt']
+
+
+def pytest_addoption(parser):
+    parser.addoption('--scales', default='1',
+                     help='comma-separated factors for scaling the corpora')
+    parser.addoption('--rounds', type=int, default=3,
+                     help='number of timed rounds per benchmark')
+    parser.addoption('--memory-baseline', default=None,
+                     help='JSON file with peak memory of an earlier run')
+    parser.addoption('--memory-save', default=None,
+                     help='write the peak memory of this run to a JSON file')
+    parser.addoption('--memory-tolerance', type=float, default=0.1,
+                     help='allowed relative increase of peak memory')
+
+
+def pytest_generate_tests(metafunc):
+    if 'scale' in metafunc.fixturenames:
+        scales = [int(x) for x in metafunc.config.getoption(
+            'scales').split(',')]
+        metafunc.parametrize('scale', scales, ids=[
+            'x{0}'.format(x) for x in scales])
+
+
+def scale_tsv(source, target, scale):
+    """
+    Write `scale` copies of a TSV corpus with distinct ids, poems, stanzas
+    and rhyme ids.
+    """
+    header, rows = None, []
+    with open(source, encoding='utf8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line.strip() or line.startswith(('#', '@')):
+                continue
+            if header is None:
+                header = line.split('\t')
+            else:
+                rows.append(line.split('\t'))
+    columns = {h.lower(): i for i, h in enumerate(header)}
+    poem, stanza = columns['poem'], columns['stanza']
+    rhymeids = columns['rhymeids']
+    top_id = max(int(row[0]) for row in rows)
+    top_rhyme = max(int(x) for row in rows for x in row[rhymeids].split())
+    with open(target, 'w', encoding='utf8') as f:
+        f.write('\t'.join(header) + '\n')
+        for copy in range(scale):
+            for row in rows:
+                row = list(row)
+                row[0] = str(int(row[0]) + copy * top_id)
+                if copy:
+                    row[poem] += '-{0}'.format(copy)
+                    row[stanza] += '-{0}'.format(copy)
+                    row[rhymeids] = ' '.join(
+                        str(int(x) + copy * top_rhyme) if x != '0' else x for
+                        x in row[rhymeids].split())
+                f.write('\t'.join(row) + '\n')
+
+
+def scale_lyrics(target, scale):
+    """Write `scale` copies of all lyrics into one text file."""
+    texts = [Path(poepy_path('data', name)).read_text(encoding='utf8') for
+             name in LYRICS]
+    with open(target, 'w', encoding='utf8') as f:
+        for copy in range(scale):
+            for text in texts:
+                f.write(text.replace('@title: ', '@title: {0} '.format(
+                    copy)).rstrip('\n') + '\n\n')
+
+
+@pytest.fixture(scope='session')
+def corpus(tmp_path_factory):
+    """Return the path of a (scaled) corpus, creating it on first use."""
+    paths = {}
+
+    def get(name, scale):
+        if (name, scale) not in paths:
+            path = tmp_path_factory.getbasetemp().joinpath(
+                '{0}-x{1}'.format(scale, name))
+            if name == 'lyrics.txt':
+                scale_lyrics(str(path), scale)
+            else:
+                scale_tsv(poepy_path('data', name), str(path), scale)
+            paths[name, scale] = str(path)
+        return paths[name, scale]
+    return get
+
+
+@pytest.fixture(scope='session')
+def memory_log(request):
+    config = request.config
+    baseline = {}
+    if config.getoption('memory_baseline'):
+        with open(config.getoption('memory_baseline')) as f:
+            baseline = json.load(f)
+    log = {}
+    yield baseline, log
+    if config.getoption('memory_save'):
+        with open(config.getoption('memory_save'), 'w') as f:
+            json.dump(log, f, indent=2, sort_keys=True)
+
+
+@pytest.fixture
+def run(request, benchmark, memory_log):
+    """
+    Trace the peak memory of one call of a function and time it afterwards.
+
+    Notes
+    -----
+    Pass `setup` for functions which cache their results: it is called
+    untimed before each call and returns the arguments as `(args, kw)`.
+    """
+    baseline, log = memory_log
+    tolerance = request.config.getoption('memory_tolerance')
+
+    def measure(func, *args, setup=None, **kw):
+        if setup:
+            args, kw = setup()
+        tracemalloc.start()
+        try:
+            func(*args, **kw)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        log[request.node.name] = peak
+        benchmark.extra_info['peak_memory'] = peak
+        expected = baseline.get(request.node.name)
+        if expected and peak > expected * (1 + tolerance):
+            pytest.fail('peak memory {0} exceeds baseline {1}'.format(
+                peak, expected))
+        if setup:
+            return benchmark.pedantic(
+                func, setup=setup,
+                rounds=request.config.getoption('rounds'), iterations=1)
+        return benchmark.pedantic(
+            func, args=args, kwargs=kw,
+            rounds=request.config.getoption('rounds'), iterations=1)
+    return measure
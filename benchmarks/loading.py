@@ -0,0 +1,37 @@
+"""
+Startup timings for loading the bundled corpora with and without cache.
+
+Run with `python benchmarks/loading.py`. The corpora are copied to a
+temporary directory, so no snapshots are written next to the package data.
+"""
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from poepy.poepy import Poems, poepy_path
+
+
+def timed(func, *args, **kw):
+    start = time.perf_counter()
+    func(*args, **kw)
+    return time.perf_counter() - start
+
+
+def main():
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        for name in ['Wang1980.tsv', 'Baxter1992.tsv', 'CJP.tsv']:
+            path = str(tmp / name)
+            shutil.copy(poepy_path('data', name), path)
+            plain = timed(Poems, path)
+            cold = timed(Poems.load_cached, path)
+            warm = timed(Poems.load_cached, path)
+            print('{0:15} plain {1:7.3f}s  cold {2:7.3f}s  warm {3:7.3f}s'.format(
+                name, plain, cold, warm))
+    finally:
+        shutil.rmtree(str(tmp))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Recall and timings of the LSH rhyme candidate search on the bundled corpora.
+
+Run with `python benchmarks/lsh.py`. The recall is measured against all pairs
+of different line-final words which share a rhyme id in the gold annotation.
+Only Wang1980 is used, since the other corpora align characters, not sounds.
+"""
+import itertools
+import time
+
+from poepy.poepy import Poems, poepy_path
+from poepy.lsh import RhymeLSH
+
+SETTINGS = [(32, 16, 0.3), (64, 16, 0.3), (64, 32, 0.3), (128, 64, 0.2)]
+
+
+def gold_pairs(poems):
+    groups = {}
+    for idx in poems:
+        rhymeids = poems[idx, poems._ref]
+        words = poems[idx, poems._alignment].n
+        if words and rhymeids and rhymeids[-1]:
+            groups.setdefault(rhymeids[-1], set()).add(
+                ' '.join(str(x) for x in words[-1]))
+    return {tuple(sorted(pair)) for words in groups.values() for pair in
+            itertools.combinations(words, 2)}
+
+
+def main():
+    for name in ['Wang1980.tsv']:
+        poe = Poems(poepy_path('data', name))
+        gold = gold_pairs(poe)
+        for num_perm, bands, threshold in SETTINGS:
+            start = time.perf_counter()
+            lsh = RhymeLSH.from_poems(poe, num_perm=num_perm, bands=bands)
+            found = {tuple(sorted(pair[:2])) for pair in lsh.candidates(
+                threshold)}
+            seconds = time.perf_counter() - start
+            print('{0:15} perm {1:4} bands {2:3} threshold {3:.1f}  '
+                  '{4:6} candidates  recall {5:.3f}  {6:.3f}s'.format(
+                      name, num_perm, bands, threshold, len(found),
+                      len(gold & found) / len(gold), seconds))
+
+
+if __name__ == '__main__':
+    main()
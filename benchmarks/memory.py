@@ -0,0 +1,33 @@
+"""
+Memory of a loaded collection before and after compacting its columns.
+
+Run with `python benchmarks/memory.py`.
+"""
+import gc
+import tracemalloc
+
+from poepy.poepy import Poems, poepy_path
+
+
+def traced():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def main():
+    tracemalloc.start()
+    for name in ['Wang1980.tsv', 'Baxter1992.tsv']:
+        start = traced()
+        poe = Poems(poepy_path('data', name))
+        loaded = traced()
+        poe.compact()
+        compacted = traced()
+        print('{0:15} loaded {1:6.1f} MB  compacted {2:6.1f} MB  '
+              'saved {3:6.1f} MB'.format(
+                  name, (loaded - start) / 1e6, (compacted - start) / 1e6,
+                  (loaded - compacted) / 1e6))
+        del poe
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+Timings for building rhyme networks from the bundled Chinese corpora.
+
+Run with `python benchmarks/network.py`.
+"""
+import time
+
+import networkx as nx
+
+from poepy.poepy import Poems, poepy_path
+from poepy.network import RhymeNetwork
+from poepy.components import RhymeComponents
+
+
+def main():
+    for name in ['Wang1980.tsv', 'Baxter1992.tsv', 'CJP.tsv']:
+        poe = Poems(poepy_path('data', name))
+        start = time.perf_counter()
+        network = RhymeNetwork.from_poems(poe)
+        count = time.perf_counter() - start
+        start = time.perf_counter()
+        G = network.to_networkx()
+        graph = time.perf_counter() - start
+        start = time.perf_counter()
+        network.to_csr()
+        csr = time.perf_counter() - start
+        start = time.perf_counter()
+        list(nx.connected_components(G))
+        nx_comps = time.perf_counter() - start
+        start = time.perf_counter()
+        RhymeComponents.from_poems(poe).components()
+        uf_comps = time.perf_counter() - start
+        print('{0:15} {1:6} nodes {2:6} edges  count {3:.3f}s  '
+              'networkx {4:.3f}s  csr {5:.3f}s  components with graph {6:.3f}s  '
+              'union-find {7:.3f}s'.format(
+                  name, len(network.nodes), len(network.edges), count, graph,
+                  csr, count + graph + nx_comps, uf_comps))
+
+
+if __name__ == '__main__':
+    main()
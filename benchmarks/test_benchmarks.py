@@ -0,0 +1,117 @@
+"""
+Benchmarks for parsing, loading, analysing and exporting the bundled corpora.
+
+See `conftest.py` for running the suite and checking for regressions.
+"""
+import pytest
+
+from poepy.poepy import Poems, parser, poepy_path
+from poepy.poem import Poem, PoemCollection
+
+from conftest import LYRICS
+
+
+@pytest.fixture
+def lyrics(corpus, scale):
+    return corpus('lyrics.txt', scale)
+
+
+@pytest.fixture
+def wang(corpus, scale):
+    return Poems(corpus('Wang1980.tsv', scale))
+
+
+@pytest.mark.parametrize('name', ['Wang1980.tsv', 'Baxter1992.tsv', 'CJP.tsv'])
+def test_init(run, corpus, scale, name):
+    run(Poems, corpus(name, scale))
+
+
+def test_parser(run, lyrics, scale):
+    poe = run(parser, lyrics)
+    # each copy of a poem keeps its own title
+    assert len(poe.cols) == scale * sum(
+        len(parser(poepy_path('data', name)).cols) for name in LYRICS)
+
+
+def test_poem_from_text(run, lyrics):
+    with open(lyrics, encoding='utf8') as f:
+        text = f.read()
+    run(Poem.from_text, text)
+
+
+def test_poem_collection_to_poems(run, lyrics):
+    with open(lyrics, encoding='utf8') as f:
+        poems = PoemCollection.from_texts([f.read()])
+    run(poems.to_poems)
+
+
+def test_stats(run, wang, capsys):
+    def setup():
+        # statistics are cached, so that each round would only print them
+        wang._statistics = None
+        return (wang, ), {}
+    run(Poems.stats, setup=setup)
+
+
+def test_statistics_subset(run, wang):
+    wang.statistics()
+    run(wang.statistics, *wang.cols[:10])
+
+
+def test_rhyme_network(run, wang):
+    run(wang.get_rhyme_network)
+
+
+def test_connected_components(run, wang):
+    run(wang.get_connected_components)
+
+
+def test_compare(run, corpus, scale, capsys):
+    def setup():
+        # fresh collections per round, so that partitions are not cached
+        return (Poems(corpus('Wang1980.tsv', scale)), Poems(corpus(
+            'Baxter1992.tsv', scale)), '*'), {}
+    run(Poems.compare, setup=setup)
+
+
+def test_pprint(run, lyrics, capsys):
+    poe = parser(lyrics)
+    run(poe.pprint, '*')
+
+
+def test_html(run, wang, tmp_path):
+    run(wang.html, '*', filename=str(tmp_path / 'wang.html'))
+
+
+def test_songbook(run, lyrics, tmp_path):
+    poe = parser(lyrics)
+    run(poe.songbook, '*', filename=str(tmp_path / 'songs.tex'))
+
+
+def test_text(run, lyrics, tmp_path):
+    poe = parser(lyrics)
+    run(poe.text, str(tmp_path / 'lyrics.txt'))
+
+
+def test_to_sqlite(run, wang, tmp_path):
+    run(wang.to_sqlite, str(tmp_path / 'wang.db'))
+
+
+def test_from_sqlite(run, wang, tmp_path):
+    path = str(tmp_path / 'wang.db')
+    wang.to_sqlite(path)
+    run(Poems.from_sqlite, path, where={'poem': wang.cols[:10]})
+
+
+def test_align_rhymes(run, corpus, scale):
+    poe = Poems(corpus('Eichendorff1815.tsv', scale))
+
+    def setup():
+        # a fresh aligner per round, so that no group is cached
+        poe.rhyme_aligner = None
+        return (poe, ), {}
+    run(Poems.align_rhymes, setup=setup)
+
+
+def test_scheme_index(run, wang):
+    run(wang.get_scheme_index)
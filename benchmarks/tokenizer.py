@@ -0,0 +1,56 @@
+"""
+Micro-benchmark for the line tokenizers.
+
+Run with `python benchmarks/tokenizer.py`. Reports lines per second for
+CJK input of the size of `Wang1980.tsv` and for the Latin-script samples.
+"""
+import glob
+import timeit
+
+from poepy.poepy import poepy_path, parse_line, _split_chinese, \
+    _CHINESE_CHAR, is_chinese
+from poepy import poem
+
+
+def text_lines(cjk):
+    lines = []
+    for path in sorted(glob.glob(poepy_path('data', '*.txt'))):
+        with open(path, encoding='utf8') as f:
+            for line in f:
+                line = line.rstrip('\n')
+                if line.strip() and not line.startswith(('@', '[')) and \
+                        bool(_CHINESE_CHAR.search(line)) == cjk:
+                    lines.append(line)
+    return lines
+
+
+def cjk_lines():
+    """Annotated CJK lines, repeated to the number of lines in Wang1980."""
+    with open(poepy_path('data', 'Wang1980.tsv'), encoding='utf8') as f:
+        size = sum(1 for _ in f) - 1
+    lines = text_lines(True)
+    return (lines * (size // len(lines) + 1))[:size]
+
+
+def report(name, func, lines, number=5):
+    seconds = min(timeit.repeat(
+        lambda: [func(line) for line in lines], number=1, repeat=number))
+    print('{0:30} {1:7} lines {2:12.0f} lines/s'.format(
+        name, len(lines), len(lines) / seconds))
+
+
+def main():
+    cjk = cjk_lines()
+    latin = text_lines(False) * 20
+    report('is_chinese (per char)', lambda line: [
+        is_chinese(char) for char in line], cjk)
+    report('split chinese', _split_chinese, cjk)
+    report('parse_line (cjk)', lambda line: parse_line(
+        _split_chinese(line), {0: 0}), cjk)
+    report('parse_line (latin)', lambda line: parse_line(
+        line.split(), {0: 0}), latin)
+    report('poem.parse_line (latin)', poem.parse_line, latin)
+
+
+if __name__ == '__main__':
+    main()
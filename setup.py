@@ -11,12 +11,14 @@ setup(
     zip_safe=False,
     license="GPL",
     include_package_data=True,
+    python_requires='>=3.7',
     install_requires=[
         'clldutils',
         'lingpy',
     ],
     extras_require={
-        "test": ['pytest', 'pytest-coverage']
+        "test": ['pytest', 'pytest-coverage'],
+        "benchmark": ['pytest-benchmark'],
     },
     url='https://github.com/lingpy/poepy',
     long_description=codecs.open('README.md', 'r', 'utf-8').read(),
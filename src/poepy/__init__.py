@@ -1 +1,22 @@
-from .poepy import *
+import importlib
+
+__version__ = '0.2.1.dev0'
+
+__all__ = ['Poems', 'parser', 'iter_poems', 'poepy_path', 'is_chinese',
+           'parse_line']
+
+
+def __getattr__(name):
+    # The main module depends on lingpy, which is slow to import, so it is
+    # only loaded when one of its names is first accessed.
+    if name.startswith('__'):
+        raise AttributeError(name)
+    try:
+        return getattr(importlib.import_module('poepy.poepy'), name)
+    except AttributeError:
+        raise AttributeError(
+            "module 'poepy' has no attribute '{0}'".format(name)) from None
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
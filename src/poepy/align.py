@@ -0,0 +1,142 @@
+"""
+Phonetic alignment of the rhyme words of rhyme groups.
+"""
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from lingpy import Multiple, log
+
+from poepy import profiling
+
+
+def _blocks(seq):
+    """Split a sequence at the brackets marking parts outside the rhyme."""
+    blocks = [[]]
+    for token in seq:
+        if token in '()':
+            blocks += [[]]
+        elif token != '-':
+            blocks[-1].append(token)
+    return blocks
+
+
+def _align_block(rows, keywords):
+    filled = [row for row in rows if row]
+    if not filled:
+        return [[] for row in rows]
+    if len(set(map(tuple, filled))) == 1:
+        width = len(filled[0])
+        return [list(row) or ['-'] * width for row in rows]
+    msa = Multiple([list(row) for row in filled])
+    try:
+        msa.prog_align(**keywords)
+    except ValueError:
+        # tokens without sound classes, like Chinese characters, are padded
+        width = max(len(row) for row in rows)
+        return [list(row) + ['-'] * (width - len(row)) for row in rows]
+    aligned = iter(msa.alm_matrix)
+    width = len(msa.alm_matrix[0])
+    return [next(aligned) if row else ['-'] * width for row in rows]
+
+
+def align_group(seqs, keywords=None):
+    """
+    Align the sequences of a rhyme group.
+
+    Notes
+    -----
+    Parts of the sequences in brackets, like the onsets of the words, are
+    aligned separately from the rest, provided all sequences have the same
+    brackets. Otherwise, brackets are dropped before aligning. Sequences
+    which cannot be aligned phonetically are padded with gaps.
+    """
+    keywords = keywords or {}
+    blocks = [_blocks(seq) for seq in seqs]
+    if len(set(len(block) for block in blocks)) != 1:
+        blocks = [[sum(block, [])] for block in blocks]
+    logger = log.get_logger()
+    level = logger.level
+    logger.setLevel('ERROR')
+    try:
+        columns = [_align_block(rows, keywords) for rows in zip(*blocks)]
+    finally:
+        logger.setLevel(level)
+    alignment = []
+    for parts in zip(*columns):
+        row = list(parts[0])
+        for i, part in enumerate(parts[1:]):
+            row += ['(' if i % 2 == 0 else ')'] + list(part)
+        alignment.append(row)
+    return alignment
+
+
+def _align_key(key, settings):
+    return align_group(key, dict(settings))
+
+
+class RhymeAligner(object):
+    """
+    Memoized alignment of rhyme groups.
+
+    Notes
+    -----
+    Alignments are cached by the multiset of the sequences of a group and
+    the settings passed to `prog_align` of lingpy, so that groups which
+    recur in different poems or collections are aligned only once.
+    """
+
+    def __init__(self, **keywords):
+        self.keywords = keywords
+        self.cache = {}
+
+    @staticmethod
+    def key(seqs):
+        return tuple(sorted(tuple(str(t) for t in seq) for seq in seqs))
+
+    def align(self, groups, workers=1):
+        """
+        Align rhyme groups, given as lists of sequences.
+
+        Returns
+        -------
+        alignments : list
+            The alignment of each group, with the rows in the order of the
+            sequences of the group.
+        """
+        settings = tuple(sorted(self.keywords.items()))
+        keys = [self.key(seqs) for seqs in groups]
+        todo = list(dict.fromkeys(
+            key for key in keys if (settings, key) not in self.cache))
+        if workers > 1 and len(todo) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                aligned = profiling.map(
+                    pool, _align_key, todo, [settings] * len(todo),
+                    chunksize=max(1, len(todo) // (4 * workers)))
+        else:
+            aligned = [_align_key(key, settings) for key in todo]
+        for key, alignment in zip(todo, aligned):
+            self.cache[settings, key] = alignment
+
+        alignments = []
+        for seqs, key in zip(groups, keys):
+            rows = iter(self.cache[settings, key])
+            order = sorted(range(len(seqs)), key=lambda i: tuple(
+                str(t) for t in seqs[i]))
+            alignment = [None] * len(seqs)
+            for i in order:
+                alignment[i] = list(next(rows))
+            alignments.append(alignment)
+        return alignments
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self.cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path, **keywords):
+        aligner = cls(**keywords)
+        if os.path.isfile(path):
+            with open(path, 'rb') as f:
+                aligner.cache = pickle.load(f)
+        return aligner
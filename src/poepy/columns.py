@@ -0,0 +1,95 @@
+"""
+Compact columnar storage for the list-valued columns of a collection.
+"""
+from array import array
+
+from lingpy import basictypes
+
+
+class IntColumn(object):
+    """
+    Integer lists of all rows stored in one flat buffer with row offsets.
+    """
+
+    def __init__(self, positions):
+        self.positions = positions
+        self.values, self.offsets = array('i'), array('q', [0])
+
+    def append(self, value):
+        self.values.extend(value)
+        self.offsets.append(len(self.values))
+
+    def get(self, idx):
+        pos = self.positions[idx]
+        return self.values[self.offsets[pos]:self.offsets[pos + 1]]
+
+    def __getitem__(self, idx):
+        return basictypes.ints(self.get(idx))
+
+
+class TokenColumn(IntColumn):
+    """
+    Token lists of all rows stored as integer codes into a table of tokens.
+    """
+
+    def __init__(self, positions):
+        IntColumn.__init__(self, positions)
+        self.tokens, self.codes = [], {}
+
+    def append(self, value):
+        codes = []
+        for token in value:
+            try:
+                codes.append(self.codes[token])
+            except KeyError:
+                self.codes[token] = len(self.tokens)
+                self.tokens.append(token)
+                codes.append(self.codes[token])
+        IntColumn.append(self, codes)
+
+    def __getitem__(self, idx):
+        return basictypes.lists([self.tokens[code] for code in self.get(idx)])
+
+
+def compact(data, columns):
+    """
+    Move the given columns of the rows in `data` into columnar storage.
+
+    Parameters
+    ----------
+    data : dict
+        The rows of the collection, keyed by their id.
+    columns : dict
+        The index of each column in the rows along with a flag indicating
+        whether the column holds tokens (`True`) or integers (`False`).
+
+    Returns
+    -------
+    store : dict
+        The compacted columns, keyed by column index. The cells of the rows
+        are set to `None`.
+    """
+    positions = {idx: i for i, idx in enumerate(data)}
+    store = {
+        column: TokenColumn(positions) if tokens else IntColumn(positions)
+        for column, tokens in columns.items()}
+    for idx, row in data.items():
+        for column, values in store.items():
+            values.append([str(x) for x in row[column]] if isinstance(
+                values, TokenColumn) else row[column])
+            row[column] = None
+    return store
+
+
+def decompact(data, store):
+    """
+    Write compacted columns back into the rows in `data`.
+
+    Notes
+    -----
+    Cells which were assigned after compacting are kept.
+    """
+    for column, values in store.items():
+        for idx, row in data.items():
+            if row[column] is None:
+                row[column] = values[idx]
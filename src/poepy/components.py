@@ -0,0 +1,96 @@
+"""
+Connected components of rhyme words with a disjoint-set forest.
+"""
+from array import array
+
+
+class RhymeComponents(object):
+    """
+    Rhyme words coded as integers and merged when they rhyme.
+
+    Notes
+    -----
+    The forest uses union by size and path halving, so merging all rhyme
+    groups of a collection takes almost linear time. Words can be added and
+    merged at any time, but merges cannot be undone.
+    """
+
+    def __init__(self):
+        self.words, self._word_idx = [], {}
+        self.parent, self.size = array('i'), array('i')
+        self.ref = None
+
+    def add(self, word):
+        """Return the code of a word, adding it as a component of its own."""
+        try:
+            return self._word_idx[word]
+        except KeyError:
+            code = self._word_idx[word] = len(self.words)
+            self.words.append(word)
+            self.parent.append(code)
+            self.size.append(1)
+            return code
+
+    def find(self, code):
+        """Return the root code of the component of a word code."""
+        parent = self.parent
+        while parent[code] != code:
+            parent[code] = parent[parent[code]]
+            code = parent[code]
+        return code
+
+    def union(self, codeA, codeB):
+        """Merge the components of two word codes and return the new root."""
+        rootA, rootB = self.find(codeA), self.find(codeB)
+        if rootA == rootB:
+            return rootA
+        if self.size[rootA] < self.size[rootB]:
+            rootA, rootB = rootB, rootA
+        self.parent[rootB] = rootA
+        self.size[rootA] += self.size[rootB]
+        return rootA
+
+    def add_group(self, seqs):
+        """Add the rhyme words of one rhyme group and merge them."""
+        codes = [self.add(' '.join(seq)) for seq in seqs]
+        for code in codes[1:]:
+            self.union(codes[0], code)
+
+    @classmethod
+    def from_poems(cls, poems, ref='rhymeids'):
+        components = cls()
+        components.ref = ref
+        for key, msa in poems.msa[ref].items():
+            components.add_group(msa['seqs'])
+        return components
+
+    def component(self, word):
+        """Return the id (the root code) of the component of a word."""
+        return self.find(self._word_idx[word])
+
+    def component_size(self, word):
+        return self.size[self.component(word)]
+
+    def members(self, word):
+        root = self.component(word)
+        return [other for code, other in enumerate(self.words) if
+                self.find(code) == root]
+
+    def components(self):
+        """
+        Return the members of all components.
+
+        Returns
+        -------
+        components : dict
+            The words of each component, keyed by consecutive ids starting
+            from 1 in the order of the first word of each component.
+        """
+        groups = {}
+        for code, word in enumerate(self.words):
+            groups.setdefault(self.find(code), []).append(word)
+        return {i + 1: members for i, members in enumerate(groups.values())}
+
+    def __len__(self):
+        return sum(1 for code in range(len(self.words)) if
+                   self.parent[code] == code)
@@ -3,3 +3,38 @@ Data handling for basic rhymes.
 """
 
 STOPS = '.,;-—…?¿!¡()'
+
+PUNCTUATION = str.maketrans('', '', ',.—!?¿¡;«»')
+
+
+def split_rhyme(word):
+    """
+    Split the rhyme label and the alignment from a word of the text format.
+
+    Returns
+    -------
+    word, rhyme, alignment : tuple
+        The word without its rhyme label, the label (`None` if the word does
+        not rhyme) and the alignment, which is given after the label or else
+        taken from the lower-cased word without punctuation.
+    """
+    word_ = word.translate(PUNCTUATION).lower()
+    if '[' in word and ']' in word:
+        rhyme = word_[word_.index('[') + 1:word_.index(']')]
+        # the label as written, before lowercasing and punctuation
+        label = word[word.index('[') + 1:word.index(']')]
+        word = word.replace('[' + label + ']', '')
+        if '/' in rhyme:
+            rhyme, alm = rhyme.split('/')
+            return word, rhyme, alm.replace('_', ' ')
+        return word, rhyme, word_.replace('[' + rhyme + ']', ' ').strip()
+    return word, None, word_
+
+
+def rhyme_label(number, upper=False):
+    """Return the n-th rhyme label (a, b, ..., z, aa, ab, ...)."""
+    label, start = '', 65 if upper else 97
+    while number:
+        number, rest = divmod(number - 1, 26)
+        label = chr(start + rest) + label
+    return label
@@ -0,0 +1,81 @@
+"""
+Automatic detection of rhymes from the phonetic tails of lines.
+"""
+import numpy as np
+from lingpy.algorithm.clustering import flat_upgma
+
+from poepy.rhymeindex import segments
+
+
+def line_tail(tokens, size=3):
+    """Return the reversed tail of the last word of a line."""
+    if not tokens:
+        return []
+    return segments(tokens[-1])[::-1][:size]
+
+
+def tail_distances(tails):
+    """
+    Compute normalized edit distances between all pairs of tails.
+
+    Notes
+    -----
+    The dynamic programming table is filled for all pairs at once, so the
+    number of Python-level operations only depends on the length of the
+    tails, not on the number of pairs.
+    """
+    n = len(tails)
+    matrix = np.zeros((n, n))
+    if n < 2:
+        return matrix
+    codes = {}
+    size = max(len(tail) for tail in tails)
+    encoded = np.full((n, size), -1, dtype=np.int32)
+    lengths = np.array([len(tail) for tail in tails])
+    for i, tail in enumerate(tails):
+        encoded[i, :len(tail)] = [codes.setdefault(t, len(codes)) for t in tail]
+    left, right = np.triu_indices(n, k=1)
+    seqA, seqB = encoded[left], encoded[right]
+    table = np.zeros((len(left), size + 1, size + 1), dtype=np.int32)
+    table[:, :, 0] = np.arange(size + 1)
+    table[:, 0, :] = np.arange(size + 1)
+    for i in range(1, size + 1):
+        for j in range(1, size + 1):
+            table[:, i, j] = np.minimum(
+                np.minimum(table[:, i - 1, j], table[:, i, j - 1]) + 1,
+                table[:, i - 1, j - 1] + (seqA[:, i - 1] != seqB[:, j - 1]))
+    lenA, lenB = lengths[left], lengths[right]
+    longest = np.maximum(lenA, lenB)
+    scores = np.where(
+        longest > 0,
+        table[np.arange(len(left)), lenA, lenB] / np.maximum(longest, 1),
+        1.0)
+    matrix[left, right] = matrix[right, left] = scores
+    return matrix
+
+
+def detect_rhymes(tails, threshold=0.5):
+    """
+    Cluster the lines of one stanza by the distances of their tails.
+
+    Returns
+    -------
+    clusters : list
+        A cluster number for each line, with 0 for lines without partner.
+    """
+    labels = [0 for tail in tails]
+    matrix = tail_distances(tails)
+    if len(tails) < 2:
+        return labels
+    clusters = flat_upgma(threshold, matrix.tolist())
+    cluster = 1
+    for key, members in sorted(clusters.items()):
+        if len(members) > 1:
+            for member in members:
+                labels[member] = cluster
+            cluster += 1
+    return labels
+
+
+def _detect_all(stanzas, threshold):
+    return [detect_rhymes(tails, threshold) for tails in stanzas]
@@ -0,0 +1,147 @@
+"""
+Evaluation of rhyme annotations with B-cubed scores.
+"""
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from poepy import profiling
+
+
+def normalize(rhymeids):
+    """
+    Convert the rhyme ids of the lines of a stanza into a partition.
+
+    Notes
+    -----
+    Each line is represented by its first non-zero rhyme id, renumbered in
+    the order of appearance. Lines without rhyme form a class of their own.
+    """
+    out, converter, cogid = [], {}, 1
+    for ids in rhymeids:
+        for rhymeid in ids:
+            if rhymeid:
+                if rhymeid not in converter:
+                    converter[rhymeid] = cogid
+                    cogid += 1
+                out += [converter[rhymeid]]
+                break
+        else:
+            out += [cogid]
+            cogid += 1
+    return tuple(out)
+
+
+def _labels(partitions):
+    """Offset the classes of each partition to make them globally unique."""
+    labels, offset = [], 0
+    for partition in partitions:
+        labels += [x + offset for x in partition]
+        offset += len(partition) + 1
+    return np.array(labels, dtype=np.int64)
+
+
+def _bcubed(one, other, stanza, sizes):
+    """Per-stanza B-cubed scores of `one` against `other` in one pass."""
+    _, inverse, counts = np.unique(
+        one * (other.max() + 1) + other, return_inverse=True,
+        return_counts=True)
+    scores = counts[inverse.ravel()] / np.bincount(one)[one]
+    return np.bincount(stanza, weights=scores) / sizes
+
+
+def score(partitionsA, partitionsB, stanzas):
+    """
+    Compare two collections of stanza partitions.
+
+    Parameters
+    ----------
+    partitionsA, partitionsB : dict
+        Partitions of the stanzas as created by `normalize`.
+    stanzas : list
+        The stanzas to compare.
+
+    Returns
+    -------
+    results : dict
+        Per-stanza scores in `stanzas`, the stanzas with differences in
+        `diffs`, stanzas missing in the second collection in `missing`,
+        stanzas with different numbers of lines in `unequal`, exact matches
+        in `hits` out of `count` comparable stanzas, and the averaged
+        `precision`, `recall` and `fscore`.
+    """
+    results = {'stanzas': {}, 'diffs': [], 'missing': [], 'unequal': [],
+               'hits': 0, 'count': 0, 'precision': 0, 'recall': 0,
+               'fscore': 0}
+    compared = []
+    for stanza in stanzas:
+        if stanza not in partitionsB:
+            results['missing'] += [stanza]
+        elif len(partitionsA[stanza]) != len(partitionsB[stanza]):
+            results['unequal'] += [stanza]
+        else:
+            results['count'] += 1
+            if partitionsA[stanza] == partitionsB[stanza]:
+                results['hits'] += 1
+            if partitionsA[stanza]:
+                compared += [stanza]
+    if not compared:
+        return results
+
+    one = _labels([partitionsA[stanza] for stanza in compared])
+    other = _labels([partitionsB[stanza] for stanza in compared])
+    sizes = np.array([len(partitionsA[stanza]) for stanza in compared])
+    stanza = np.repeat(np.arange(len(compared)), sizes)
+    p = _bcubed(one, other, stanza, sizes)
+    r = _bcubed(other, one, stanza, sizes)
+    f = 2 * p * r / (p + r)
+    for i, key in enumerate(compared):
+        results['stanzas'][key] = {
+            'precision': p[i], 'recall': r[i], 'fscore': f[i]}
+        if f[i] != 1:
+            results['diffs'] += [key]
+    results['precision'] = p.mean()
+    results['recall'] = r.mean()
+    results['fscore'] = f.mean()
+    return results
+
+
+def _score_pair(args):
+    return score(*args)
+
+
+def compare_matrix(*collections, stanzas=None, refs=None, workers=1):
+    """
+    Compare all pairs of collections of poems.
+
+    Parameters
+    ----------
+    collections : Poems
+        The collections to compare.
+    stanzas : list (default=None)
+        The stanzas to compare, defaults to all stanzas of the first
+        collection in each pair.
+    refs : list (default=None)
+        The column holding the rhyme ids for each collection, defaults to
+        the reference of each collection.
+    workers : int (default=1)
+        Number of processes used for scoring the pairs.
+
+    Returns
+    -------
+    matrix : dict
+        The results of `score` for each pair `(i, j)` of collection indices.
+    """
+    refs = refs or [None for poems in collections]
+    partitions = [poems.partitions(ref) for poems, ref in zip(
+        collections, refs)]
+    pairs = list(itertools.product(range(len(collections)), repeat=2))
+    tasks = [(partitions[i], partitions[j],
+              stanzas or collections[i].rows) for i, j in pairs]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = profiling.map(pool, _score_pair, tasks)
+    else:
+        results = [_score_pair(task) for task in tasks]
+    return dict(zip(pairs, results))
@@ -0,0 +1,171 @@
+"""
+Lazy access to collections of poems stored in large TSV files.
+"""
+import os
+import mmap
+import unicodedata
+from array import array
+from collections import OrderedDict, Counter
+
+from lingpy import basictypes
+from lingpy.basic.parser import read_conf
+
+
+class LazyPoems(object):
+    """
+    Read-only view on a TSV file of poems which decodes rows on demand.
+
+    Notes
+    -----
+    The file is memory-mapped and scanned once for the byte offsets of the
+    rows and for the poem and stanza of each row. All other fields are only
+    decoded when they are accessed with `self[idx, column]`. Use
+    `materialize` to turn a selection of poems into a regular `Poems`
+    object.
+    """
+
+    def __init__(self, infile, ref='rhymeids', line='line', poem='poem',
+                 stanza='stanza', alignment='alignment',
+                 line_in_source='line_in_source', conf=None, cache_size=1024,
+                 **keywords):
+        conf = conf or os.path.join(os.path.dirname(__file__), 'conf',
+                                    'poems.rc')
+        self.filename = infile
+        self._ref, self._line, self._poem = ref, line, poem
+        self._stanza, self._alignment = stanza, alignment
+        self._transcription = line_in_source
+        self._conf = conf
+        self._alias, self._class, _, _ = read_conf(conf)
+        self._rows = OrderedDict()
+        self._cache_size = cache_size
+
+        self._file = open(infile, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets, self._keys = array('q'), {}
+        self._stanza_index, self._poem_index = OrderedDict(), OrderedDict()
+
+        header = None
+        pos, size = 0, len(self._map)
+        while pos < size:
+            end = self._map.find(b'\n', pos)
+            if end == -1:
+                end = size
+            raw = self._map[pos:end].rstrip(b'\r')
+            if raw and not raw.startswith((b'#', b'@')):
+                if header is None:
+                    header = self._decode(raw)[1:]
+                    self.columns = [self._alias.get(h, h.lower()) for h in
+                                    header]
+                    self.header = {h: i for i, h in enumerate(self.columns)}
+                    poem_idx = self.header[self._alias.get(poem, poem)]
+                    stanza_idx = self.header[self._alias.get(stanza, stanza)]
+                    split = max(poem_idx, stanza_idx) + 2
+                else:
+                    fields = raw.split(b'\t', split)
+                    idx = int(fields[0])
+                    self._keys[idx] = len(self._offsets)
+                    self._offsets.append(pos)
+                    self._poem_index.setdefault(
+                        self._decode_field(fields[poem_idx + 1]), []
+                    ).append(idx)
+                    self._stanza_index.setdefault(
+                        self._decode_field(fields[stanza_idx + 1]), []
+                    ).append(idx)
+            pos = end + 1
+
+        self.rows = sorted(self._stanza_index, key=lambda x: x.lower())
+        self.cols = sorted(self._poem_index, key=lambda x: x.lower())
+        self.height, self.width = len(self.rows), len(self.cols)
+
+    @staticmethod
+    def _decode_field(raw):
+        return unicodedata.normalize('NFC', raw.decode('utf-8'))
+
+    def _decode(self, raw):
+        return self._decode_field(raw).split('\t')
+
+    def _read(self, idx):
+        start = self._offsets[self._keys[idx]]
+        end = self._map.find(b'\n', start)
+        if end == -1:
+            end = len(self._map)
+        return self._decode(self._map[start:end].rstrip(b'\r'))[1:]
+
+    def _fields(self, idx):
+        try:
+            return self._rows[idx]
+        except KeyError:
+            fields = self._rows[idx] = self._read(idx)
+            if len(self._rows) > self._cache_size:
+                self._rows.popitem(last=False)
+            return fields
+
+    def _convert(self, column, value):
+        if column in (self._line, self._alignment):
+            return basictypes.lists(value)
+        if column == self._ref:
+            return basictypes.ints(value)
+        return self._class.get(column, str)(value)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, tuple) and len(idx) == 2:
+            idx, column = idx
+            column = self._alias.get(column, column)
+            if column not in self.header:
+                if idx not in self._keys:
+                    raise KeyError(
+                        "No line with ID {0} specified could be found.".format(
+                            idx))
+                return
+            return self._convert(column, self._fields(idx)[
+                self.header[column]])
+        return [self._convert(column, value) for column, value in zip(
+            self.columns, self._fields(idx))]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def stanza_lines(self, stanza):
+        """Return the ids of the lines of a stanza in their order."""
+        idxs = self._stanza_index[stanza]
+        return sorted(idxs, key=lambda x: self[x, 'line_order'])
+
+    def poem_lines(self, poem):
+        """Return the ids of the lines of a poem ordered by stanza and line."""
+        return sorted(self._poem_index[poem], key=lambda x: (
+            self[x, self._stanza], self[x, 'line_order']))
+
+    def stats(self):
+        ref, line = self.header[self._ref], self.header[self._line]
+        rhymes, words = Counter(), 0
+        for idx in self:
+            fields = self._read(idx)
+            rhymes.update(int(x) for x in fields[ref].split() if x != '0')
+            words += len(fields[line].split(' + '))
+        print('Poems:       {0}'.format(len(self.cols)))
+        print('Stanzas:     {0}'.format(len(self.rows)))
+        print('Lines:       {0}'.format(len(self)))
+        print('Rhyme words: {0}'.format(sum(
+            count for count in rhymes.values() if count > 1)))
+        print('Rhymes:      {0}'.format(sum(
+            1 for count in rhymes.values() if count > 1)))
+        print('Words:       {0}'.format(words))
+
+    def materialize(self, *poems, **keywords):
+        """Load the given poems (or all with "*") into a `Poems` object."""
+        from poepy.poepy import Poems
+        if poems[0] == '*':
+            poems = self.cols
+        data = {0: list(self.columns)}
+        for poem in poems:
+            for idx in self._poem_index[poem]:
+                data[idx] = [self._class.get(column, str)(value) for
+                             column, value in zip(self.columns, self._read(idx))]
+        return Poems(data, conf=self._conf, **keywords)
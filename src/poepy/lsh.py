@@ -0,0 +1,116 @@
+"""
+Approximate search for rhyme candidates with MinHash and LSH.
+"""
+import itertools
+import zlib
+
+import numpy as np
+
+from poepy.rhymeindex import segments
+
+# Mersenne prime used for the universal hash functions
+_PRIME = (1 << 31) - 1
+
+
+def shingles(word, n=2, size=4):
+    """
+    Return the n-grams of the reversed tail of a word.
+
+    Notes
+    -----
+    The last `size` segments are reversed and padded with a boundary marker
+    `#` before the n-grams are taken, so that the final sounds of a word
+    weigh more than the sounds at the start of the tail.
+    """
+    tail = ['#'] + segments(word)[::-1][:size]
+    if len(tail) < n:
+        return {tuple(tail)}
+    return {tuple(tail[i:i + n]) for i in range(len(tail) - n + 1)}
+
+
+class RhymeLSH(object):
+    """
+    Locality-sensitive hashing index over the line-final words of poems.
+
+    Parameters
+    ----------
+    num_perm : int (default=64)
+        Number of hash functions of the MinHash signatures.
+    bands : int (default=16)
+        Number of bands the signatures are split into. More bands increase
+        the recall at the cost of more candidates to verify.
+    n : int (default=2)
+        Size of the n-grams.
+    size : int (default=4)
+        Number of final segments of a word which are considered.
+    """
+
+    def __init__(self, num_perm=64, bands=16, n=2, size=4, seed=1):
+        if num_perm % bands:
+            raise ValueError('num_perm must be a multiple of bands')
+        self.num_perm, self.bands, self.n, self.size = num_perm, bands, n, size
+        random = np.random.RandomState(seed)
+        self._a = random.randint(1, _PRIME, size=num_perm).astype(np.int64)
+        self._b = random.randint(0, _PRIME, size=num_perm).astype(np.int64)
+        self.words, self.occurrences = [], {}
+
+    def add(self, idx, word):
+        """Add the final word of the line `idx`."""
+        word = word if isinstance(word, str) else ' '.join(word)
+        if word not in self.occurrences:
+            self.words.append(word)
+            self.occurrences[word] = []
+        self.occurrences[word].append(idx)
+
+    @classmethod
+    def from_poems(cls, poems, **keywords):
+        lsh = cls(**keywords)
+        for idx in poems:
+            words = poems[idx, poems._alignment].n
+            if words:
+                lsh.add(idx, [str(x) for x in words[-1]])
+        return lsh
+
+    def signatures(self):
+        """Compute the MinHash signatures of all words in one pass."""
+        ids, offsets = [], []
+        for word in self.words:
+            offsets.append(len(ids))
+            ids.extend(zlib.crc32(' '.join(gram).encode('utf8')) for gram in
+                       shingles(word, self.n, self.size))
+        ids = np.array(ids, dtype=np.int64) % _PRIME
+        hashes = (ids[:, None] * self._a[None, :] + self._b[None, :]) % _PRIME
+        return np.minimum.reduceat(hashes, np.array(offsets), axis=0)
+
+    def candidates(self, threshold=0.5):
+        """
+        Return pairs of different words with similar tails.
+
+        Returns
+        -------
+        pairs : list
+            Tuples `(wordA, wordB, similarity)`, with the similarity being
+            the estimated Jaccard similarity of the n-grams, sorted by
+            decreasing similarity.
+        """
+        if len(self.words) < 2:
+            return []
+        signatures = self.signatures()
+        rows = self.num_perm // self.bands
+        pairs = set()
+        for band in range(self.bands):
+            buckets = {}
+            chunk = signatures[:, band * rows:(band + 1) * rows]
+            for i, key in enumerate(map(bytes, chunk)):
+                buckets.setdefault(key, []).append(i)
+            for members in buckets.values():
+                pairs.update(itertools.combinations(members, 2))
+        if not pairs:
+            return []
+        left, right = np.array(sorted(pairs)).T
+        similarity = (signatures[left] == signatures[right]).mean(axis=1)
+        keep = similarity >= threshold
+        return sorted(
+            ((self.words[a], self.words[b], float(s)) for a, b, s in zip(
+                left[keep], right[keep], similarity[keep])),
+            key=lambda x: (-x[2], x[0], x[1]))
@@ -0,0 +1,161 @@
+"""
+Rhyme networks built from the rhyme groups of a collection.
+"""
+import itertools
+from array import array
+
+
+class RhymeNetwork(object):
+    """
+    Rhyme words as nodes, linked when they occur in the same rhyme group.
+
+    Notes
+    -----
+    Nodes are coded as integers in the order of their first occurrence, the
+    labels are stored in `nodes`. Occurrences (line ids) and the stanzas of
+    each edge (indices into `stanzas`) are kept as integer arrays.
+    """
+
+    def __init__(self):
+        self.nodes, self.stanzas = [], []
+        self.weights, self.occurrences = array('i'), []
+        self.edges = {}
+        self.ref = None
+        self._node_idx, self._stanza_idx = {}, {}
+
+    def _node(self, label):
+        try:
+            return self._node_idx[label]
+        except KeyError:
+            self._node_idx[label] = len(self.nodes)
+            self.nodes.append(label)
+            self.weights.append(0)
+            self.occurrences.append(array('i'))
+            return self._node_idx[label]
+
+    def _stanza(self, stanza):
+        try:
+            return self._stanza_idx[stanza]
+        except KeyError:
+            self._stanza_idx[stanza] = len(self.stanzas)
+            self.stanzas.append(stanza)
+            return self._stanza_idx[stanza]
+
+    def add_group(self, idxs, seqs, stanzas):
+        """
+        Add one rhyme group, given its line ids, rhyme words and stanzas.
+
+        Notes
+        -----
+        Each pair of rhyme words is attributed to the stanza of its first
+        line. Returns the nodes and edges touched by the group.
+        """
+        nodes = []
+        for idx, seq in zip(idxs, seqs):
+            node = self._node(' '.join(seq))
+            self.weights[node] += 1
+            self.occurrences[node].append(idx)
+            nodes.append(node)
+        stanzas = [self._stanza(stanza) for stanza in stanzas]
+        keys = []
+        for (nodeA, stanza), (nodeB, _) in itertools.combinations(
+                zip(nodes, stanzas), r=2):
+            key = (nodeA, nodeB) if nodeA <= nodeB else (nodeB, nodeA)
+            try:
+                edge = self.edges[key]
+            except KeyError:
+                edge = self.edges[key] = array('i')
+            edge.append(stanza)
+            keys.append(key)
+        return nodes, keys
+
+    def remove_group(self, idxs, seqs, stanzas):
+        """
+        Remove a rhyme group which was added with the same arguments.
+
+        Notes
+        -----
+        Nodes keep their code when their weight drops to zero, but they are
+        left out of the exported graph.
+        """
+        nodes = []
+        for idx, seq in zip(idxs, seqs):
+            node = self._node_idx[' '.join(seq)]
+            self.weights[node] -= 1
+            self.occurrences[node].remove(idx)
+            nodes.append(node)
+        stanzas = [self._stanza_idx[stanza] for stanza in stanzas]
+        keys = []
+        for (nodeA, stanza), (nodeB, _) in itertools.combinations(
+                zip(nodes, stanzas), r=2):
+            key = (nodeA, nodeB) if nodeA <= nodeB else (nodeB, nodeA)
+            self.edges[key].remove(stanza)
+            if not self.edges[key]:
+                del self.edges[key]
+            keys.append(key)
+        return nodes, keys
+
+    @classmethod
+    def from_poems(cls, poems, ref='rhymeids'):
+        network = cls()
+        network.ref = ref
+        for key, msa in poems.msa[ref].items():
+            network.add_group(
+                msa['ID'], msa['seqs'],
+                [poems[idx, poems._stanza] for idx in msa['ID']])
+        return network
+
+    def edge_weight(self, nodeA, nodeB):
+        key = (nodeA, nodeB) if nodeA <= nodeB else (nodeB, nodeA)
+        return len(self.edges.get(key, ()))
+
+    def to_networkx(self):
+        """Return the network as a `networkx.Graph`."""
+        import networkx as nx
+        G = nx.Graph()
+        self.update_networkx(G, range(len(self.nodes)), self.edges)
+        return G
+
+    def update_networkx(self, G, nodes, edges):
+        """
+        Bring the given nodes and edges of a `networkx.Graph` up to date.
+        """
+        for node in nodes:
+            label = self.nodes[node]
+            if self.weights[node]:
+                G.add_node(label, weight=self.weights[node], occurrences=[
+                    str(idx) for idx in self.occurrences[node]])
+            elif label in G:
+                G.remove_node(label)
+        for key in edges:
+            labelA, labelB = self.nodes[key[0]], self.nodes[key[1]]
+            if key in self.edges:
+                G.add_edge(labelA, labelB, weight=len(self.edges[key]),
+                           stanza=[self.stanzas[s] for s in self.edges[key]])
+            elif G.has_edge(labelA, labelB):
+                G.remove_edge(labelA, labelB)
+
+    def to_csr(self):
+        """
+        Return the symmetric adjacency matrix of edge weights in CSR format.
+
+        Notes
+        -----
+        Requires scipy. Rows and columns follow the order of `nodes`.
+        """
+        import numpy as np
+        from scipy.sparse import csr_matrix
+        size = len(self.nodes)
+        rows = np.fromiter(
+            (a for a, b in self.edges), dtype=np.int32, count=len(self.edges))
+        cols = np.fromiter(
+            (b for a, b in self.edges), dtype=np.int32, count=len(self.edges))
+        data = np.fromiter(
+            (len(s) for s in self.edges.values()), dtype=np.int32,
+            count=len(self.edges))
+        loops = rows == cols
+        return csr_matrix(
+            (np.concatenate([data, data[~loops]]),
+             (np.concatenate([rows, cols[~loops]]),
+              np.concatenate([cols, rows[~loops]]))),
+            shape=(size, size))
@@ -1,41 +1,56 @@
 """
 Parser for basic poetry format.
 """
+import re
+import unicodedata
 from collections import OrderedDict
-from poepy.data import STOPS
+from functools import lru_cache, partial
+from poepy.data import STOPS, split_rhyme
+
+
+_BRACKETS = re.compile(r'([\[\]])')
+_nfd = partial(unicodedata.normalize, 'NFD')
+
+
+@lru_cache(maxsize=None)
+def _stop_table(stops):
+    return str.maketrans('', '', stops)
 
 
 def parse_word(text, stops=STOPS):
     """Extract rhyme information from one word."""
     in_bracket, in_phonetic = False, False
     words, rhymes, sounds = [], [], []
-    for char in text:
-        if char == '[':
+    table = _stop_table(stops)
+    for part in _BRACKETS.split(text):
+        if part == '[':
             in_bracket = True
             rhymes += ['']
             words += ['']
             sounds += ['']
-        elif char == ']':
+        elif part == ']':
             in_bracket = False
             in_phonetic = False
+        elif in_bracket:
+            if not in_phonetic and '/' in part:
+                rhyme, part = part.split('/', 1)
+                rhymes[-1] += rhyme
+                in_phonetic = True
+            if in_phonetic:
+                sounds[-1] += part.replace('/', '')
+            else:
+                rhymes[-1] += part
         else:
-            if in_bracket:
-                if char == '/':
-                    in_phonetic = True
-                elif not in_phonetic:
-                    rhymes[-1] += char
-                else:
-                    sounds[-1] += char
+            part = part.translate(table)
+            if not part:
+                pass
+            elif not words:
+                words += [part]
+                rhymes += ['']
+                sounds += ['']
             else:
-                if char in stops:
-                    pass
-                elif not words:
-                    words += [char]
-                    rhymes += ['']
-                    sounds += ['']
-                else:
-                    words[-1] += char
-                    
+                words[-1] += part
+
     return words, rhymes, sounds
 
 
@@ -57,6 +72,55 @@ def parse_line(text, stops=STOPS):
         rhymes += [r]
     return text, original, no_rhymes, phonetic, rhymes, refrain
 
+
+class Line(object):
+    """
+    A parsed line of a poem.
+
+    Notes
+    -----
+    The fields can also be read like the keys of a dictionary, as in
+    `line['rhymes']`.
+    """
+    __slots__ = ('original_text', 'original_words', 'words', 'sounds',
+                 'rhymes', 'refrain')
+
+    def __init__(self, original_text, original_words, words, sounds, rhymes,
+                 refrain):
+        self.original_text = original_text
+        self.original_words = original_words
+        self.words = words
+        self.sounds = sounds
+        self.rhymes = rhymes
+        self.refrain = refrain
+
+    @classmethod
+    def from_text(cls, text, stops=STOPS):
+        return cls(*parse_line(text, stops=stops))
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __repr__(self):
+        return '<Line {0!r}>'.format(self.original_text)
+
+
+def _split_poems(text):
+    """Split a text at the metadata blocks which start each poem."""
+    lines, content = [], False
+    for line in text.splitlines():
+        if line.startswith('@') and content:
+            yield '\n'.join(lines)
+            lines, content = [], False
+        lines.append(line)
+        content = content or (bool(line.strip()) and not line.startswith('@'))
+    if lines:
+        yield '\n'.join(lines)
+
+
 class Poem(object):
 
     def __init__(self, meta, stanzas, **kw):
@@ -83,11 +147,15 @@ class Poem(object):
     def from_text(cls, text, **kw):
         """
         Create a poem from text.
+
+        Notes
+        -----
+        Stanzas are stored as dictionaries of the lines, keyed by the number
+        of the stanza and the number of the line within the stanza.
         """
         meta = {}
         stanzas = OrderedDict()
         current_stanza = 0
-        stanzas_in_order = []
         line_number = 0
         for line in text.splitlines():
             if line.startswith('@') and ':' in line:
@@ -100,15 +168,94 @@ class Poem(object):
                     line_number = 1
                 else:
                     line_number += 1
-                parsed = parse_line(line)
-                stanzas[current_stanza][line_number] = {
-                        'original_text': parsed[0],
-                        'original_words': parsed[1],
-                        'words': parsed[2],
-                        'rhymes': parsed[3],
-                        'sounds': parsed[4],
-                        'refrain': parsed[5]}
+                stanzas[current_stanza][line_number] = Line.from_text(line)
         return cls(meta, stanzas)
 
+    def to_rows(self, number=1):
+        """
+        Return the poem in the form yielded by `poepy.poepy.iter_poems`.
+
+        Notes
+        -----
+        The text is normalized to NFD and the original words are split into
+        rhyme labels and alignments with the same function as in `parser`,
+        with the rhyme labels numbered in the order of their appearance. The
+        parsed fields of the lines are not used for this, since they lack
+        characters which `parser` keeps, like hyphens. Chords and Chinese
+        lines are not analysed by this format.
+        """
+        rhymes, rows = {}, []
+        for stanza, lines in self.stanzas.items():
+            for order, line in lines.items():
+                rhymeids, alignment, words = [], [], []
+                for word in line.original_words:
+                    word, rhyme, alm = split_rhyme(_nfd(word))
+                    if rhyme is not None and rhyme not in rhymes:
+                        rhymes[rhyme] = len(rhymes) + 1
+                    rhymeids.append(rhymes.get(rhyme, 0))
+                    alignment.append(alm)
+                    words.append(word)
+                # columns in the order of poepy.poepy.HEADER
+                rows.append([
+                    _nfd(self.title), str(number),
+                    '{0}.{1}'.format(number, stanza),
+                    _nfd(('  ' if line.refrain else '') + line.original_text),
+                    ' + '.join(words), order, rhymeids, ' + '.join(alignment),
+                    'R' if line.refrain else '',
+                    ['_' for word in line.original_words]])
+        meta = {_nfd(key): _nfd(value) if isinstance(value, str) else value
+                for key, value in self.meta.items()}
+        return _nfd(self.title), meta, rows
+
+    def to_poems(self, **keywords):
+        """Convert the poem to `poepy.poepy.Poems`."""
+        return PoemCollection([self]).to_poems(**keywords)
+
+
+class PoemCollection(object):
+    """
+    Poems parsed from many texts.
+
+    Notes
+    -----
+    Each text can hold several poems, each starting with its metadata.
+    """
+
+    def __init__(self, poems=None):
+        self.poems = list(poems or [])
+
+    @classmethod
+    def from_texts(cls, texts, **kw):
+        return cls(Poem.from_text(chunk, **kw) for text in texts for chunk
+                   in _split_poems(text))
+
+    @classmethod
+    def from_files(cls, *paths, **kw):
+        def texts():
+            for path in paths:
+                with open(path, encoding='utf-8-sig') as f:
+                    yield f.read()
+        return cls.from_texts(texts(), **kw)
+
+    def __len__(self):
+        return len(self.poems)
+
+    def __iter__(self):
+        return iter(self.poems)
 
+    def __getitem__(self, idx):
+        return self.poems[idx]
 
+    def to_poems(self, **keywords):
+        """
+        Convert the poems to `poepy.poepy.Poems` without reading the texts again.
+
+        Notes
+        -----
+        Poems are numbered in their order and their rhyme ids are made
+        unique across the collection, as in `Poems.from_directory`.
+        """
+        from poepy.poepy import Poems, _renumber
+        return Poems.from_iter(_renumber(
+            poem.to_rows(i + 1) for i, poem in enumerate(self.poems)),
+            **keywords)
@@ -1,15 +1,48 @@
+import gc
+import io
+import os
+import json
+import re
+import pickle
+import copyreg
+import hashlib
 import pathlib
 import itertools
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
-from lingpy import *
-import networkx as nx
-from tqdm import tqdm
-from tabulate import tabulate
-from lingpy.util import read_text_file
-from clldutils.text import strip_chars
-from lingpy.convert.html import colorRange, tokens2html
-from lingpy.evaluate.acd import _get_bcubed_score, _format_results
-from lingpy import log
+import numpy as np
+
+from lingpy import Alignments, log, basictypes
+from lingpy.basic.parser import read_conf
+
+from poepy import __version__, profiling
+from poepy.network import RhymeNetwork
+from poepy.components import RhymeComponents
+from poepy.detection import line_tail, _detect_all
+from poepy.evaluate import normalize, score
+from poepy.lazy import LazyPoems
+from poepy.columns import compact, decompact
+from poepy.rhymeindex import RhymeIndex
+from poepy.lsh import RhymeLSH
+from poepy.align import RhymeAligner
+from poepy.statistics import Statistics
+from poepy.schemes import SchemeIndex
+from poepy import store
+from poepy.data import PUNCTUATION, split_rhyme, rhyme_label
+
+
+# Code point ranges treated as Chinese characters. The last range reproduces
+# the original check `0xf900 <= ordch <= ordch`, which accepts every code
+# point from U+F900 upwards (including the CJK extension blocks).
+_CHINESE = '\u3400-\u9fff\uf900-\U0010ffff'
+_CHINESE_CHAR = re.compile('[' + _CHINESE + ']')
+_CHINESE_NAME = re.compile('[' + _CHINESE + ']+')
+_CHINESE_TOKEN = re.compile(
+    '(?:\\[[^\\[' + _CHINESE + ']*)?[' + _CHINESE + '][^\\[' + _CHINESE + ']*'
+    '|\\[[^\\[' + _CHINESE + ']*')
+_NESTED_BRACKET = re.compile('\\[[^\\[' + _CHINESE + ']*\\[')
 
 
 def is_chinese(name):
@@ -21,20 +54,36 @@ def is_chinese(name):
 
     Taken from http://stackoverflow.com/questions/16441633/python-2-7-test-if-characters-in-a-string-are-all-chinese-characters
     """
-    if not name:
-        return False
-    for ch in name:
-        ordch = ord(ch)
-        if not (0x3400 <= ordch <= 0x9fff) and not (0x20000 <= ordch <= 0x2ceaf) \
-                and not (0xf900 <= ordch <= ordch) and not (0x2f800 <= ordch <= 0x2fa1f):
-            return False
-    return True
+    return bool(name) and _CHINESE_NAME.fullmatch(name) is not None
 
 
 def poepy_path(*comps):
     return str(pathlib.Path(__file__).parent.joinpath(*comps))
 
 
+def _split_chinese(line):
+    """Split a line in Chinese characters, keeping rhyme brackets in place."""
+    nline = _CHINESE_TOKEN.findall(line)
+    if ''.join(nline) == line and not _NESTED_BRACKET.search(line):
+        return nline
+    # nested brackets or leading material need the full character walk
+    nline, bracket = [], 0
+    for char in line:
+        if is_chinese(char):
+            if bracket:
+                bracket -= 1
+                nline[-1] += char
+            else:
+                nline += [char]
+        else:
+            if char == '[':
+                bracket += 1
+                nline += ['']
+            nline[-1] += char
+    return nline
+
+
+@profiling.stage('parse_line', dump=False)
 def parse_line(line, rhymes):
     """Parse a line in the library and return the content."""
     out, alms, nline, chords = [], [], [], []
@@ -42,63 +91,69 @@ def parse_line(line, rhymes):
     for i, word in enumerate(line):
         # Check for chords in the data
         if word.count('/') > 1:
-            chord, these_chords, syllables = 0, [], []
-            for char in word:
-                if char == '/' and chord:
-                    chord -= 1
-                elif char == '/':
-                    these_chords += ['']
-                    syllables += ['']
-                    chord += 1
-                elif chord and char != '/':
-                    these_chords[-1] += char
-                else:
-                    if not syllables:
-                        syllables += ['']
-                        if not these_chords:
-                            these_chords += ['_']
-                    syllables[-1] += char
-
+            parts = word.split('/')
+            these_chords, syllables = parts[1::2], parts[2::2]
+            syllables += [''] * (len(these_chords) - len(syllables))
+            if parts[0]:
+                these_chords, syllables = ['_'] + these_chords, \
+                    [parts[0]] + syllables
             chords += [' '.join(these_chords)]
             word = ' '.join(syllables)
         else:
             chords += ['_']
 
-        word_ = strip_chars(',.—!?¿¡;«»', word).lower()
-
-        if '[' in word and ']' in word:
-            rhyme = word_[word_.index('[') + 1:word_.index(']')]
-            word = word.replace('[' + rhyme + ']', '')
-            if '/' in rhyme:
-                rhyme, alm = rhyme.split('/')
-                alm = alm.replace('_', ' ')
-            else:
-                alm = word_.replace('[' + rhyme + ']', ' ').strip()
+        word, rhyme, alm = split_rhyme(word)
+        if rhyme is not None:
             if rhyme not in rhymes:
                 rhymes[rhyme] = mr
                 mr += 1
             out += [rhymes[rhyme]]
-            alms += [alm]
-            nline += [word]
         else:
             out += [0]
-            alms += [word_]
-            nline += [word]
+        alms += [alm]
+        nline += [word]
     return out, alms, nline, chords
 
 
-def parser(filename):
-    text = read_text_file(filename, normalize='NFD', lines=True)
+def _iter_lines(filename, normalize='NFD'):
+    """Yield the normalized lines of a text file one at a time."""
+    with io.open(str(filename), 'r', encoding='utf-8-sig') as fp:
+        for line in fp:
+            yield unicodedata.normalize(normalize, line.strip('\r\n'))
+
+
+HEADER = ['poem', 'poem_number', 'stanza', 'line_in_source', 'line',
+          'line_order', 'rhymeids', 'alignment', 'refrain', 'chords']
+
+
+def iter_poems(filename):
+    """
+    Iterate over the poems of a file in poepy text format.
+
+    Notes
+    -----
+    The file is read line by line and each poem is yielded as soon as it is
+    complete, so the memory needed for parsing is bounded by the size of the
+    largest poem, not by the size of the file.
+
+    Yields
+    ------
+    poem : tuple
+        A tuple `(title, meta, rows)`, with `meta` being the metadata of the
+        poem (`None` if the metadata block was never closed by an empty
+        line) and `rows` the parsed lines in the order of `HEADER`.
+    """
     comment = '#'
-    data = {0:
-                ['poem', 'poem_number', 'stanza', 'line_in_source', 'line',
-                 'line_order', 'rhymeids', 'alignment', 'refrain', 'chords']}
-    meta, M = {}, {}
-    number, stanza, idx, order = 0, 0, 1, 1
+    meta, current, rows = {}, None, []
+    number, stanza, order = 0, 0, 1
     atzone = False
-    for line in text:
+    for line in _iter_lines(filename):
         if line.startswith('@'):
             if not atzone:
+                if current is not None or rows:
+                    yield meta.get('title', 'poem-{0}'.format(number)), \
+                        current, rows
+                    current, rows = None, []
                 meta = {}
             atzone = True
             meta[line[1:line.index(':')]] = line[line.index(':') + 1:].strip()
@@ -109,8 +164,7 @@ def parser(filename):
             if atzone:
                 number += 1
                 atzone = False
-                M[meta.get('title', 'poem-{0}'.format(number))] = {
-                    k: v for k, v in meta.items()}
+                current = {k: v for k, v in meta.items()}
                 rhymes = {0: 0}
         elif line.startswith('[') and line.endswith(']'):
             pass
@@ -121,24 +175,12 @@ def parser(filename):
             refrain = ''
             if line.startswith('  '):
                 refrain = 'R'
-            if [x for x in line if is_chinese(x)]:
-                nline, bracket = [], 0
-                for char in line:
-                    if is_chinese(char):
-                        if bracket:
-                            bracket -= 1
-                            nline[-1] += char
-                        else:
-                            nline += [char]
-                    else:
-                        if char == '[':
-                            bracket += 1
-                            nline += ['']
-                        nline[-1] += char
+            if _CHINESE_CHAR.search(line):
+                nline = _split_chinese(line)
             else:
                 nline = line.strip().split()
             rhymeids, alignment, nline, chords = parse_line(nline, rhymes)
-            data[idx] = [
+            rows += [[
                 meta.get('title', 'poem-{0}'.format(number)),
                 str(number),
                 '{0}.{1}'.format(number, stanza),
@@ -149,19 +191,245 @@ def parser(filename):
                 ' + '.join(alignment),
                 refrain,
                 chords
-            ]
-            idx += 1
+            ]]
             order += 1
-    poe = Poems(data)
-    poe._meta['poems'] = M
-    return poe
+    if current is not None or rows:
+        yield meta.get('title', 'poem-{0}'.format(number)), current, rows
+
+
+@profiling.stage('parser', items=lambda poems, *args, **keywords: len(
+    poems))
+def parser(filename):
+    return Poems.from_iter(iter_poems(filename))
+
+
+def _parse_poems(filename):
+    return list(iter_poems(filename))
+
+
+def _renumber(poems):
+    """
+    Renumber poems, stanzas and rhyme ids of poems from different files.
+
+    Notes
+    -----
+    Rhyme ids in the text format are local to a poem, so each poem is
+    assigned a fresh block of rhyme ids in the order in which the poems are
+    passed. Titles which were already used by an earlier poem are followed
+    by the number of the poem, like `Intro (2)`, so that poems from
+    different files are not merged.
+    """
+    number, offset, titles = 0, 0, set()
+    for title, meta, rows in poems:
+        number += 1
+        if title in titles:
+            title = '{0} ({1})'.format(title, number)
+        titles.add(title)
+        top = offset
+        for row in rows:
+            row[0] = title
+            row[1] = str(number)
+            row[2] = '{0}.{1}'.format(number, row[2].split('.')[-1])
+            row[6] = [x + offset if x else 0 for x in row[6]]
+            top = max([top] + row[6])
+        offset = top
+        yield title, meta, rows
+
+
+def _cache_path(infile):
+    return str(infile) + '.poepy.pkl'
+
+
+def _cache_key(infile, *args):
+    """Key a cache entry by content, modification time and poepy version."""
+    with open(infile, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return digest, os.stat(infile).st_mtime_ns, __version__, args
+
+
+# attributes which cannot be pickled and are restored when loading a cache
+_UNCACHED = ('_class', 'log')
+
+
+def _restore_strings(cls, items, attrs):
+    obj = cls.__new__(cls)
+    list.extend(obj, items)
+    obj.__dict__.update(attrs)
+    return obj
+
+
+def _reduce_strings(obj):
+    # lingpy's typed lists convert their items in `extend`, which breaks the
+    # default pickle protocol for list subclasses
+    return _restore_strings, (type(obj), list(obj), obj.__dict__)
+
+
+_DISPATCH = dict(copyreg.dispatch_table)
+_DISPATCH[basictypes._strings] = _reduce_strings
+_DISPATCH[basictypes.lists] = _reduce_strings
+
+
+_HTML_HEAD = ('<html><head><meta http-equiv="content-type"'
+              ' content="text/html; charset=utf-8" /></head>')
+
+
+def _html_row(row):
+    return '<tr>' + ''.join(
+        '<td>{0}</td>'.format(cell) for cell in row) + '</tr>\n'
+
+
+def _render_song(title, author, lines):
+    """Render one song, given its lines, as a latex songbook block."""
+    text = [r'\begin{{song}}{{{title}}}{{}}{{}}{{{author}}}{{}}{{}}'.format(
+        title=title, author=author) + '\n']
+    stanza, before, refrain = '', '', ''
+    for new_stanza, refrain, words, chords in lines:
+        if new_stanza != stanza:
+
+            if before == 'verse':
+                text += [r'\end{SBVerse}' + '\n']
+            elif before == 'refrain':
+                text += [r'\end{SBChorus}' + '\n']
+            if refrain:
+                text += [r'\begin{SBChorus}' + '\n']
+                before = 'refrain'
+            else:
+                before = 'verse'
+                text += [r'\begin{SBVerse}' + '\n']
+            stanza = new_stanza
+        line = []
+        for word, chord_string in zip(words, chords):
+            small_line = []
+            for syl, chord in zip(word, chord_string.split()):
+                syl = syl.replace('_', ' ')
+                if chord.strip('_').strip():
+                    small_line += [r'\Ch{' + chord + '}{' + syl + '}']
+                else:
+                    small_line += [syl]
+            line += ['-'.join(small_line)]
+        text += [' '.join(line) + '\n\n']
+    if refrain:
+        text += [r'\end{SBChorus}' + '\n']
+    else:
+        text += [r'\end{SBVerse}' + '\n']
+    text += [r'\end{song}' + '\n\n']
+    return ''.join(text)
+
+
+def _stanza_key(stanza):
+    return [(0, int(x)) if x.isdigit() else (1, x) for x in str(
+        stanza).split('.')]
+
+
+def _text_word(tokens, label, alignment, chord):
+    """Write a word with its rhyme label and chords in the text format."""
+    word = ' '.join(tokens)
+    if label:
+        if alignment == word.translate(PUNCTUATION).lower().strip().split(
+                ' '):
+            word = '[{0}]{1}'.format(label, word)
+        else:
+            word = '[{0}/{1}]{2}'.format(label, '_'.join(alignment), word)
+    if chord == '_':
+        return word
+    chords, syllables = chord.split(' '), word.split(' ')
+    if chords[0] == '_':
+        parts, chords, syllables = syllables[:1], chords[1:], syllables[1:]
+    else:
+        parts = ['']
+    for chord, syllable in itertools.zip_longest(chords, syllables,
+                                                 fillvalue=''):
+        parts += [chord, syllable]
+    return '/'.join(parts)
+
+
+def _render_text(title, meta, lines):
+    """
+    Render a poem in the text format read by `iter_poems`.
+
+    Notes
+    -----
+    Rhyme labels are assigned per poem in the order of appearance, stanzas
+    numbered `poem.stanza` are separated by as many empty lines as the parser
+    needs to restore their numbers.
+    """
+    text = []
+    meta = dict(meta or {})
+    if meta.get('title') != title:
+        text += ['@title: {0}\n'.format(title)]
+        meta.pop('title', None)
+    text += ['@{0}: {1}\n'.format(key, value) for key, value in meta.items()]
+    labels, previous, current = {}, 0, None
+    for stanza, refrain, words, rhymeids, alignment, chords in lines:
+        if stanza != current:
+            number = str(stanza).split('.')[-1]
+            number = int(number) if number.isdigit() else previous + 1
+            text += ['\n' * max(number - previous, 1)]
+            previous, current = number, stanza
+        line = []
+        for tokens, rhymeid, alm, chord in zip(words, rhymeids, alignment,
+                                               chords):
+            if rhymeid and rhymeid not in labels:
+                labels[rhymeid] = rhyme_label(len(labels) + 1)
+            line += [_text_word(tokens, labels.get(rhymeid), alm, chord)]
+        chinese = any(_CHINESE_CHAR.search(word) for word in line)
+        text += [('  ' if refrain else '') + ('' if chinese else ' ').join(
+            line) + '\n']
+    return ''.join(text) + '\n'
+
+
+def _song_name(poem):
+    """Return a file name for a song which is unique for its title."""
+    return '{0}-{1}'.format(
+        re.sub(r'\W+', '-', poem.lower()).strip('-')[:40],
+        hashlib.sha1(poem.encode('utf8')).hexdigest()[:8])
+
+
+def _insort(items, item, key):
+    """Insert an item into a list sorted by `key`."""
+    lo, hi, value = 0, len(items), key(item)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if key(items[mid]) < value:
+            lo = mid + 1
+        else:
+            hi = mid
+    items.insert(lo, item)
+
+
+def _count_stanzas(result, poems, *stanzas, **keywords):
+    return len(poems.rows if stanzas[:1] == ('*', ) else stanzas)
+
+
+def _count_poems(result, poems, *names, **keywords):
+    return len(poems.cols if names[:1] in [(), ('*', )] else names)
 
 
 class Poems(Alignments):
+    _compact = None
+    # number of modifications, invalidating cached statistics
+    _changes = 0
+    _statistics = None
+    scheme_index = None
+
+    def __new__(cls, *args, lazy=False, **keywords):
+        if lazy:
+            return LazyPoems(*args, **keywords)
+        return super(Poems, cls).__new__(cls)
+
+    @profiling.stage('Poems.__init__', items=lambda result, poems, *args,
+                     **keywords: len(poems))
     def __init__(self, infile, ref='rhymeids', line='line', poem='poem',
                  stanza='stanza', alignment='alignment',
                  line_in_source='line_in_source',
-                 conf=poepy_path('conf', 'poems.rc'), **keywords):
+                 conf=poepy_path('conf', 'poems.rc'), cache=False, lazy=False,
+                 **keywords):
+
+        if cache and isinstance(infile, str):
+            key = _cache_key(infile, ref, line, poem, stanza, alignment,
+                             line_in_source, conf)
+            if self._load_cache(_cache_path(infile), key, conf):
+                return
 
         self._stanza = stanza
         self._ref = ref
@@ -171,80 +439,772 @@ class Poems(Alignments):
         self._mode = 'fuzzy'
         self._transcription = line_in_source
 
-        Alignments.__init__(self, infile, col=poem, row=stanza, conf=conf,
-                            segments=line, ref=ref, alignment=alignment, fuzzy=True,
-                            transcription=line_in_source, split_on_tones=False)
+        with profiling.section('Alignments.__init__'):
+            Alignments.__init__(
+                self, infile, col=poem, row=stanza, conf=conf, segments=line,
+                ref=ref, alignment=alignment, fuzzy=True,
+                transcription=line_in_source, split_on_tones=False)
+        self.reindex()
+
+        if cache and isinstance(infile, str):
+            self._write_cache(_cache_path(infile), key)
+
+    add_alignments = profiling.stage(
+        'add_alignments', items=lambda result, poems, *args, **keywords: len(
+            poems.msa.get(poems._ref, {})))(Alignments.add_alignments)
+
+    @classmethod
+    def load_cached(cls, infile, **keywords):
+        """
+        Load a collection, using a binary snapshot next to the file if valid.
+
+        Notes
+        -----
+        The snapshot is written to `infile + ".poepy.pkl"` on the first
+        load and reused as long as the content and modification time of the
+        file and the version of poepy are unchanged.
+        """
+        return cls(infile, cache=True, **keywords)
+
+    def _load_cache(self, path, key, conf):
+        if not os.path.isfile(path):
+            return False
+        # unpickling creates many small objects, which would otherwise
+        # trigger repeated runs of the garbage collector
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(path, 'rb') as f:
+                cached_key, state = pickle.load(f)
+        except Exception as e:
+            log.warning('could not read cache {0}: {1}'.format(path, e))
+            return False
+        finally:
+            if enabled:
+                gc.enable()
+        if cached_key != key:
+            return False
+        shape, dtype, nonzero, values = state.pop('_array')
+        self.__dict__.update(state)
+        self._array = np.zeros(shape, dtype=dtype)
+        self._array.flat[nonzero] = values
+        self.log = log.get_logger()
+        self._class = read_conf(conf)[1]
+        for name in self.columns:
+            for alias in [name.lower(), name.upper()]:
+                self._class.setdefault(alias, str)
+        return True
+
+    def _write_cache(self, path, key):
+        state = {k: v for k, v in self.__dict__.items() if k not in _UNCACHED}
+        # the id array is mostly empty and is stored as its non-zero cells
+        nonzero = np.flatnonzero(self._array)
+        state['_array'] = (self._array.shape, self._array.dtype, nonzero,
+                           self._array.flat[nonzero])
+        try:
+            with open(path, 'wb') as f:
+                pickler = pickle.Pickler(f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickler.dispatch_table = _DISPATCH
+                pickler.dump((key, state))
+        except (IOError, OSError) as e:
+            log.warning('could not write cache {0}: {1}'.format(path, e))
+
+    def __getitem__(self, idx):
+        value = Alignments.__getitem__(self, idx)
+        if not self._compact:
+            return value
+        if isinstance(idx, tuple):
+            if value is None and idx[0] in self._data:
+                column = self.header.get(self._alias.get(idx[1]))
+                if column in self._compact:
+                    return self._compact[column][idx[0]]
+            return value
+        if idx in self._data:
+            return [self._compact[i][idx] if cell is None and i in
+                    self._compact else cell for i, cell in enumerate(value)]
+        return value
+
+    def __setitem__(self, idx, item):
+        Alignments.__setitem__(self, idx, item)
+        self._changes += 1
+        column = self._alias[idx[1]]
+        if column in {self._alias.get(self._stanza), self._alias.get(
+                self._poem), self._alias.get('line_order')}:
+            # membership or order of the lines changed
+            self._index_size = None
+        else:
+            # cells are also assigned while the collection is initialized
+            partitions = self.__dict__.get('_partitions', {})
+            for ref in [ref for ref in partitions if
+                        self._alias.get(ref) == column]:
+                del partitions[ref]
+
+    def compact(self, *columns):
+        """
+        Move list-valued columns into flat integer buffers.
+
+        Notes
+        -----
+        By default, the rhyme ids, lines and alignments are compacted. The
+        rhyme ids are stored in one integer buffer with row offsets, tokens
+        are stored as integer codes into a table of unique tokens. Values are
+        decoded when accessed with `self[idx, column]`, which also returns
+        the rows with decoded values, and written back for `output`. Other
+        methods of lingpy which read the rows directly (like `get_etymdict`)
+        do not see compacted columns, call `decompact` before using them.
+        """
+        columns = columns or (self._ref, self._line, self._alignment)
+        store = dict(self._compact or {})
+        spec = {}
+        for column in columns:
+            idx = self.header[self._alias[column]]
+            if idx not in store:
+                spec[idx] = self._alias[column] != self._ref
+        store.update(compact(self._data, spec))
+        self._compact = store
+
+    def decompact(self):
+        """Write compacted columns back into the rows and return them."""
+        store, self._compact = self._compact or {}, None
+        decompact(self._data, store)
+        names = {idx: name for name, idx in self.header.items()}
+        return [names[idx] for idx in store]
+
+    def output(self, fileformat, **keywords):
+        columns = self.decompact()
+        try:
+            return Alignments.output(self, fileformat, **keywords)
+        finally:
+            if columns:
+                self.compact(*columns)
+
+    def _export(self, fileformat, **keywords):
+        columns = self.decompact()
+        try:
+            return Alignments._export(self, fileformat, **keywords)
+        finally:
+            if columns:
+                self.compact(*columns)
+
+    def reindex(self):
+        """
+        Index the lines of all stanzas and poems in the order of the text.
+
+        Notes
+        -----
+        The index is rebuilt automatically when lines are added or removed
+        and when the `stanza`, `poem` or `line_order` of a line is modified.
+        """
+        stanzas, poems = {}, {}
+        for idx in self:
+            stanzas.setdefault(self[idx, self._stanza], []).append(idx)
+        for stanza in sorted(stanzas):
+            stanzas[stanza].sort(key=lambda x: self[x, 'line_order'])
+            for idx in stanzas[stanza]:
+                poems.setdefault(self[idx, self._poem], []).append(idx)
+        self._stanza_index, self._poem_index = stanzas, poems
+        self._partitions = {}
+        self._index_size = len(self._data)
+
+    def _check_index(self):
+        if self._index_size != len(self._data):
+            self.reindex()
+
+    def stanza_lines(self, stanza):
+        """Return the ids of the lines of a stanza in their order."""
+        self._check_index()
+        return self._stanza_index[stanza]
+
+    def poem_lines(self, poem):
+        """Return the ids of the lines of a poem ordered by stanza and line."""
+        self._check_index()
+        return self._poem_index[poem]
+
+    @classmethod
+    def from_iter(cls, poems, **keywords):
+        """
+        Build a collection from an iterable of parsed poems.
+
+        Parameters
+        ----------
+        poems : iterable
+            Tuples of `(title, meta, rows)` as yielded by `iter_poems`.
+        """
+        data, M, idx = {0: list(HEADER)}, {}, 1
+        for title, meta, rows in poems:
+            if meta is not None:
+                M[title] = meta
+            for row in rows:
+                data[idx] = row
+                idx += 1
+        poe = cls(data, **keywords)
+        poe._meta['poems'] = M
+        return poe
+
+    @classmethod
+    @profiling.stage('from_directory')
+    def from_directory(cls, path, workers=1, pattern='*.txt', **keywords):
+        """
+        Parse all files of a directory into one collection.
+
+        Parameters
+        ----------
+        path : str
+            The directory containing the files in poepy text format.
+        workers : int (default=1)
+            Number of processes used for parsing the files.
+        pattern : str (default="*.txt")
+            Glob pattern selecting the files in the directory.
+
+        Notes
+        -----
+        Files are processed in sorted order, so poem numbers, stanza ids and
+        rhyme ids do not depend on the number of workers.
+        """
+        files = sorted(pathlib.Path(path).glob(pattern))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parsed = profiling.map(pool, _parse_poems, files)
+        else:
+            parsed = map(_parse_poems, files)
+        return cls.from_iter(
+            _renumber(itertools.chain.from_iterable(parsed)), **keywords)
+
+    @classmethod
+    @profiling.stage('from_sqlite', items=lambda poems, cls, *args,
+                     **keywords: len(poems))
+    def from_sqlite(cls, path, where=None, **keywords):
+        """
+        Load a collection, or a selection of it, from a SQLite store.
+
+        Parameters
+        ----------
+        path : str
+            The store written with `to_sqlite`.
+        where : dict (default=None)
+            Filters selecting the lines to load, keyed by the poem, stanza
+            or rhyme id column or by a metadata field of the poems, like
+            `{"author": "Bob Dylan"}` or `{"rhymeids": [3, 4]}`.
+
+        Notes
+        -----
+        Line ids and rhyme ids are those of the stored collection. Only the
+        rows matching the selection are read from the store.
+        """
+        header, settings, rows, meta = store.read(path, where)
+        if not rows:
+            raise ValueError('no lines in {0} match {1}'.format(path, where))
+        rows[0] = header
+        settings.update(keywords)
+        poe = cls(rows, **settings)
+        poe._meta['poems'] = meta
+        return poe
+
+    @profiling.stage('to_sqlite', items=lambda result, poems, *args,
+                     **keywords: len(poems))
+    def to_sqlite(self, path):
+        """
+        Write the collection to a SQLite store.
+
+        Notes
+        -----
+        The store has normalized tables for poems and their metadata,
+        stanzas, lines and rhyme ids, with indexes on the poems, stanzas,
+        rhyme ids and metadata fields. An existing file is replaced.
+        """
+        store.write(self, path)
+
+    def __getattr__(self, attr):
+        # the id array and the etymological dictionary of lingpy are dropped
+        # by incremental updates and rebuilt when they are accessed again
+        if attr in ('_array', '_idx'):
+            self._build_array()
+            return self.__dict__[attr]
+        if attr == 'etd':
+            self.etd = {self._ref: self.get_etymdict(
+                ref=self._ref, modify_ref=int)}
+            return self.etd
+        return Alignments.__getattr__(self, attr)
+
+    def _build_array(self):
+        rows, self._idx = [], {}
+        for stanza, poems in self._dict.items():
+            self._idx[stanza] = []
+            for i in range(max(len(idxs) for idxs in poems.values())):
+                self._idx[stanza].append(len(rows))
+                rows.append([
+                    poems[poem][i] if poem in poems and i < len(poems[poem])
+                    else 0 for poem in self.cols])
+        self._array = np.array(rows)
+
+    def _rhyme_state(self):
+        """
+        Return the lines of each rhyme id and the highest ids in use.
+
+        Notes
+        -----
+        Both are computed on the first incremental update and maintained by
+        all later ones. Lines with the same rhyme id on several words are
+        listed once for each word, as in the alignments of lingpy.
+        """
+        if '_rhyme_lines' not in self.__dict__:
+            lines, top = {}, 0
+            for idx in self:
+                for rhymeid in self[idx, self._ref]:
+                    if rhymeid:
+                        lines.setdefault(rhymeid, []).append(idx)
+                        top = max(top, rhymeid)
+            numbers = [int(self[idx, 'poem_number']) for idx in self if str(
+                self[idx, 'poem_number']).isdigit()] if (
+                    'poem_number' in self.header) else []
+            self._rhyme_lines = lines
+            self._counters = {
+                'idx': max(self._data), 'rhyme': top,
+                'poem': max(numbers + [self.width])}
+        return self._rhyme_lines, self._counters
+
+    def _make_row(self, values):
+        """Convert a row given as dictionary or in the order of `HEADER`."""
+        if not isinstance(values, dict):
+            values = dict(zip(HEADER, values))
+        values = {self._alias.get(k, k.lower()): v for k, v in values.items()}
+        row = []
+        for column in self.columns:
+            value = values.get(column, '')
+            if column in (self._segments, self._alignment):
+                value = self._str_type(
+                    value or values.get(self._segments, ''))
+            elif column == self._ref:
+                value = self._cog_type(value or [0 for word in self._str_type(
+                    values.get(self._segments, '')).n])
+            elif isinstance(value, str) and value:
+                value = self._class.get(column, str)(value)
+            row.append(value)
+        return row
+
+    def _msa_entry(self, rhymeid, idxs):
+        from lingpy.read.qlc import normalize_alignment
+        seqs = [self[idx, self._alignment].n[self[idx, self._ref].index(
+            rhymeid)] for idx in idxs]
+        return {
+            'ID': list(idxs),
+            'taxa': [self[idx, self._poem] for idx in idxs],
+            'seqs': seqs,
+            'alignment': normalize_alignment([list(seq) for seq in seqs]),
+            'dataset': os.path.split(os.path.splitext(self.filename)[0])[1],
+            'seq_id': str(rhymeid)}
+
+    def _update(self, removed, added):
+        """
+        Replace the lines `removed` by the rows in `added` (keyed by id).
+
+        Notes
+        -----
+        Only the rhyme groups, stanzas and poems of the changed lines are
+        touched. The id array and etymological dictionary of lingpy are
+        rebuilt lazily on their next use.
+        """
+        self._changes += 1
+        lines, counters = self._rhyme_state()
+        self._check_index()
+        refIdx = self.header[self._ref]
+        old_rhymeids = {rhymeid for idx in removed for rhymeid in self[
+            idx, self._ref] if rhymeid}
+        new_rhymeids = {rhymeid for row in added.values() for rhymeid in
+                        row[refIdx] if rhymeid}
+        rhymeids = old_rhymeids | new_rhymeids
+        msa = self.msa[self._ref]
+        network = getattr(self, 'rhyme_network', None)
+        if network is not None and network.ref != self._ref:
+            network = None
+        touched_nodes, touched_edges = set(), set()
+
+        def apply(nodes_edges):
+            touched_nodes.update(nodes_edges[0])
+            touched_edges.update(nodes_edges[1])
+
+        if network is not None:
+            for rhymeid in rhymeids:
+                if rhymeid in msa:
+                    apply(network.remove_group(
+                        msa[rhymeid]['ID'], msa[rhymeid]['seqs'],
+                        [self[idx, self._stanza] for idx in
+                         msa[rhymeid]['ID']]))
+
+        stanzas, poems = set(), set()
+        for idx in removed:
+            stanza, poem = self[idx, self._stanza], self[idx, self._poem]
+            stanzas.add(stanza)
+            poems.add(poem)
+            for rhymeid in set(self[idx, self._ref]) - {0}:
+                lines[rhymeid] = [x for x in lines[rhymeid] if x != idx]
+            self._dict[stanza][poem].remove(idx)
+            if not self._dict[stanza][poem]:
+                del self._dict[stanza][poem]
+            if idx not in added:
+                del self._data[idx]
+        for idx, row in added.items():
+            stanza, poem = row[self._rowIdx], row[self._colIdx]
+            stanzas.add(stanza)
+            poems.add(poem)
+            for rhymeid in row[refIdx]:
+                if rhymeid:
+                    lines.setdefault(rhymeid, []).append(idx)
+                    counters['rhyme'] = max(counters['rhyme'], rhymeid)
+            self._data[idx] = row
+            self._dict.setdefault(stanza, {}).setdefault(poem, []).append(idx)
+            counters['idx'] = max(counters['idx'], idx)
+
+        for rhymeid in rhymeids:
+            if len(lines.get(rhymeid, [])) > 1:
+                msa[rhymeid] = self._msa_entry(rhymeid, lines[rhymeid])
+                if network is not None:
+                    apply(network.add_group(
+                        msa[rhymeid]['ID'], msa[rhymeid]['seqs'],
+                        [self[idx, self._stanza] for idx in
+                         msa[rhymeid]['ID']]))
+            else:
+                msa.pop(rhymeid, None)
+                if not lines.get(rhymeid):
+                    lines.pop(rhymeid, None)
+
+        # rows, columns and the line index
+        for stanza in stanzas:
+            idxs = [idx for poem in self._dict.get(stanza, {}).values() for
+                    idx in poem]
+            if idxs:
+                if stanza not in self._stanza_index:
+                    _insort(self.rows, stanza, lambda x: ('%s' % x).lower())
+                self._stanza_index[stanza] = sorted(
+                    idxs, key=lambda x: self[x, 'line_order'])
+            else:
+                self._dict.pop(stanza, None)
+                self.rows.remove(stanza)
+                del self._stanza_index[stanza]
+        for poem in poems:
+            poem_stanzas = {self[idx, self._stanza] for idx in
+                            self._poem_index.get(poem, []) if idx in
+                            self._data}
+            poem_stanzas.update(row[self._rowIdx] for row in added.values()
+                                if row[self._colIdx] == poem)
+            idxs = [idx for stanza in sorted(poem_stanzas) for idx in
+                    self._stanza_index.get(stanza, []) if
+                    self[idx, self._poem] == poem]
+            if idxs:
+                if poem not in self._poem_index:
+                    _insort(self.cols, poem, lambda x: x.lower())
+                self._poem_index[poem] = idxs
+            else:
+                self.cols.remove(poem)
+                del self._poem_index[poem]
+                self._meta.get('poems', {}).pop(poem, None)
+        self.height, self.width = len(self.rows), len(self.cols)
+        self._index_size = len(self._data)
+        for ref, partitions in self._partitions.items():
+            for stanza in stanzas:
+                if stanza in self._stanza_index:
+                    partitions[stanza] = normalize([
+                        self[idx, ref] for idx in self._stanza_index[stanza]])
+                else:
+                    partitions.pop(stanza, None)
+        for attr in ('_array', '_idx', 'etd'):
+            self.__dict__.pop(attr, None)
+
+        if network is not None:
+            network.update_networkx(self.G, touched_nodes, touched_edges)
+        components = getattr(self, 'rhyme_components', None)
+        if components is not None and components.ref == self._ref:
+            # merges cannot be undone, so removals need a new forest
+            if removed:
+                self.get_connected_components(self._ref)
+            else:
+                for rhymeid in rhymeids:
+                    if rhymeid in msa:
+                        components.add_group(msa[rhymeid]['seqs'])
+                self.comps = components.components()
+
+    def add_poem(self, title, meta, rows):
+        """
+        Add a poem to the collection.
+
+        Parameters
+        ----------
+        title : str
+            The title of the poem, which must not be in use.
+        meta : dict
+            The metadata of the poem (or `None`).
+        rows : list
+            The lines of the poem, as dictionaries from columns to values
+            or as lists in the order of `HEADER`, so that the poems yielded
+            by `iter_poems` can be passed directly.
+
+        Notes
+        -----
+        Rhyme ids are local to the poem and moved to a fresh block of ids,
+        stanzas are renumbered with the next poem number.
+        """
+        if title in self._poem_index or title in self.cols:
+            raise ValueError('poem {0} already exists'.format(title))
+        lines, counters = self._rhyme_state()
+        number = counters['poem'] = counters['poem'] + 1
+        offset = counters['rhyme']
+        added = {}
+        for row in rows:
+            row = self._make_row(row)
+            row[self._colIdx] = title
+            row[self._rowIdx] = '{0}.{1}'.format(
+                number, str(row[self._rowIdx]).split('.')[-1])
+            if 'poem_number' in self.header:
+                row[self.header['poem_number']] = str(number)
+            row[self.header[self._ref]] = self._cog_type([
+                x + offset if x else 0 for x in row[self.header[self._ref]]])
+            added[counters['idx'] + len(added) + 1] = row
+        if meta is not None:
+            self._meta.setdefault('poems', {})[title] = meta
+        self._update([], added)
+
+    def remove_poem(self, poem):
+        """Remove a poem with all its lines from the collection."""
+        self._update(list(self.poem_lines(poem)), {})
+
+    def update_stanza(self, stanza, rows):
+        """
+        Replace the lines of a stanza.
+
+        Notes
+        -----
+        The rows are given as in `add_poem`, but their rhyme ids are the ids
+        of the collection, so that lines can join rhyme groups of other
+        stanzas. The ids of the old lines are reused in order.
+        """
+        old = list(self.stanza_lines(stanza))
+        poem = self[old[0], self._poem]
+        lines, counters = self._rhyme_state()
+        added = {}
+        for i, row in enumerate(rows):
+            row = self._make_row(row)
+            row[self._colIdx], row[self._rowIdx] = poem, stanza
+            if 'poem_number' in self.header:
+                row[self.header['poem_number']] = self[
+                    old[0], 'poem_number']
+            if row[self.header['line_order']] in ('', None):
+                row[self.header['line_order']] = i + 1
+            added[old[i] if i < len(old) else
+                  counters['idx'] + i - len(old) + 1] = row
+        self._update(old, added)
 
     def stats(self):
-        print('Poems:       {0}'.format(len(self.cols)))
-        print('Stanzas:     {0}'.format(len(self.rows)))
-        print('Lines:       {0}'.format(len(self)))
-        print('Rhyme words: {0}'.format(sum([len(self.msa[self._ref][key]['ID']) for key
-                                             in self.msa[self._ref]])))
-        print('Rhymes:      {0}'.format(len(self.msa[self._ref])))
-        print('Words:       {0}'.format(sum([len(self[idx, 'line'].n) for idx in
-                                             self])))
+        summary = self.statistics()
+        print('Poems:       {0}'.format(summary['poems']))
+        print('Stanzas:     {0}'.format(summary['stanzas']))
+        print('Lines:       {0}'.format(summary['lines']))
+        print('Rhyme words: {0}'.format(summary['rhyme_words']))
+        print('Rhymes:      {0}'.format(summary['rhymes']))
+        print('Words:       {0}'.format(summary['words']))
+
+    @profiling.stage('statistics')
+    def statistics(self, *poems, where=None, by=None):
+        """
+        Return statistics of all poems or of a selection of them.
+
+        Parameters
+        ----------
+        poems : str
+            The poems to include, all poems if none or "*" is given.
+        where : dict (default=None)
+            Values of metadata fields the poems must have, like
+            `{"author": ["Bob Dylan", "Eminem"]}`.
+        by : str (default=None)
+            A metadata field by which the statistics are broken down.
+
+        Returns
+        -------
+        statistics : dict
+            The counts of poems, stanzas, lines, words, rhymes and rhyme
+            words, the distributions of rhyme group sizes and of rhyme words
+            per stanza, the lines per poem, and the ratios of refrain lines
+            and of words with chords. With `by`, one such dictionary is
+            returned for each value of the field.
 
+        Notes
+        -----
+        The lines are counted once per poem and the counts are cached until
+        the collection is modified, so selections are computed without
+        reading the lines again. The counts are available as records per
+        poem from `self._statistics[1].table()`.
+        """
+        key = (len(self._data), self._changes)
+        if self._statistics is None or self._statistics[0] != key:
+            self._statistics = (key, Statistics.from_poems(self))
+        statistics = self._statistics[1]
+        poems = None if not poems or poems[0] == '*' else poems
+        if by:
+            return statistics.breakdown(by, poems, where)
+        return statistics.summary(poems, where)
+
+    @profiling.stage('get_rhyme_network', items=lambda result, poems, *args,
+                     **keywords: len(poems.rhyme_network.edges))
     def get_rhyme_network(self, ref='rhymeids'):
-        G = nx.Graph()
-
-        for key, msa in tqdm(self.msa[ref].items()):
-            for idx, seq in zip(msa['ID'], msa['seqs']):
-                node = ' '.join(seq)
-                try:
-                    G.node[node]['weight'] += 1
-                    G.node[node]['occurrences'] += [str(idx)]
-                except KeyError:
-                    G.add_node(node, weight=1, occurrences=[str(idx)])
-
-            for (idxA, seqA), (idxB, seqB) in itertools.combinations(
-                    zip(msa['ID'], msa['seqs']), r=2):
-                nodeA, nodeB = ' '.join(seqA), ' '.join(seqB)
-                try:
-                    G[nodeA][nodeB]['weight'] += 1
-                    G[nodeA][nodeB]['stanza'] += [self[idx, 'stanza']]
-                except KeyError:
-                    G.add_edge(nodeA, nodeB, weight=1, stanza=[self[idx,
-                                                                    'stanza']])
-        self.G = G
-
-    def naive_rhyme_detection(self, stanzas, threshold=0.5):
+        self.rhyme_network = RhymeNetwork.from_poems(self, ref=ref)
+        self.G = self.rhyme_network.to_networkx()
+
+    def get_rhyme_index(self, ref='rhymeids'):
+        self.rhyme_index = RhymeIndex.from_poems(self, ref=ref)
+
+    @profiling.stage('align_rhymes', items=lambda result, poems, *args,
+                     **keywords: len(poems.msa.get(poems._ref, {})))
+    def align_rhymes(self, workers=1, cache=None, ref=None, **keywords):
+        """
+        Align the rhyme words of all rhyme groups.
+
+        Parameters
+        ----------
+        workers : int (default=1)
+            Number of processes used for aligning the groups.
+        cache : str (default=None)
+            File in which aligned groups are kept across calls and
+            collections. It is read before and written after aligning.
+
+        Notes
+        -----
+        The keywords are passed to `prog_align` of lingpy. The alignments
+        replace the gathered sequences in `self.msa`, where `pprint` and
+        `html` pick them up, and the aligner is stored in
+        `self.rhyme_aligner`.
+        """
+        ref = ref or self._ref
+        if cache:
+            aligner = RhymeAligner.load(cache, **keywords)
+        else:
+            aligner = getattr(self, 'rhyme_aligner', None) or RhymeAligner()
+            aligner.keywords = keywords
+        groups = list(self.msa[ref].values())
+        for msa, alignment in zip(groups, aligner.align(
+                [msa['seqs'] for msa in groups], workers=workers)):
+            msa['alignment'], msa['aligned'] = alignment, True
+        if cache:
+            aligner.save(cache)
+        self.rhyme_aligner = aligner
+
+    def _rhyme_tokens(self, idx, i):
+        """Return the aligned tokens of a rhyme word, if it was aligned."""
+        rhymeid = self[idx, self._ref][i]
+        msa = self.msa.get(self._ref, {}).get(rhymeid)
+        if msa and msa.get('aligned') and idx in msa['ID'] and \
+                self[idx, self._ref].index(rhymeid) == i:
+            return basictypes.strings(msa['alignment'][msa['ID'].index(idx)])
+        return self[idx, self._alignment].n[i]
 
+    def get_scheme_index(self, ref=None):
+        """
+        Compute the rhyme schemes of all stanzas in `self.scheme_index`.
+
+        Notes
+        -----
+        Schemes are written with one symbol per line, see
+        `poepy.schemes.scheme`.
+        """
+        self.scheme_index = SchemeIndex.from_poems(self, ref=ref)
+        self.scheme_index.key = (
+            ref or self._ref, len(self._data), self._changes)
+
+    def find_stanzas(self, scheme, prefix=False, poems=None, where=None,
+                     ref=None):
+        """
+        Return the stanzas with a rhyme scheme like `ABAB`.
+
+        Notes
+        -----
+        With `prefix`, all stanzas whose schemes start with `scheme` are
+        returned. Poems can be selected by name or by values of their
+        metadata, like `{"author": "Bob Dylan"}`. The scheme index is
+        computed on the first query and after changes to the collection.
+        """
+        if self.scheme_index is None or self.scheme_index.key != (
+                ref or self._ref, len(self._data), self._changes):
+            self.get_scheme_index(ref)
+        return self.scheme_index.find(scheme, prefix=prefix, poems=poems,
+                                      where=where)
+
+    def get_rhyme_candidates(self, threshold=0.5, **keywords):
+        """
+        Search the line-final words of all poems for similar tails with LSH.
+
+        Notes
+        -----
+        The keywords are passed to `RhymeLSH`, the index is stored in
+        `self.rhyme_lsh`.
+        """
+        self.rhyme_lsh = RhymeLSH.from_poems(self, **keywords)
+        return self.rhyme_lsh.candidates(threshold)
+
+    def naive_rhyme_detection(self, stanzas, threshold=0.5, ref='autorhymeids',
+                              size=3, workers=1):
+        """
+        Propose rhyme ids for the lines of the given stanzas.
+
+        Notes
+        -----
+        The last `size` segments of the reversed alignment of the last word of
+        each line are compared with the normalized edit distance and the lines
+        of each stanza are clustered with UPGMA. The result is stored in the
+        column `ref` in the same format as the rhyme ids, so it can be
+        evaluated with `compare`.
+        """
         if stanzas[0] == '*':
             stanzas = self.rows
-        for stanza in stanzas:
-            idxs = sorted(self.get_list(row=stanza, flat=True), key=lambda x:
-            self[x, 'line_order'])
-            matrix = [[0 for x in idxs] for y in idxs]
-            for (i, idxA), (j, idxB) in itertools.combinations(enumerate(idxs), r=2):
-                matrix[i][j] = matrix[j][i] = edit_dist(
-                    self[idxA, self._line],
-                    self[idxB, self._line],
-                    distance=True)
-
-    def get_connected_components(self):
-        if not hasattr(self, 'G'):
-            raise ValueError('compute the rhyme network first')
-        self.comps = {}
-        for i, comp in enumerate(nx.connected_components(self.G)):
-            self.comps[i + 1] = list(comp)
+        lines = [self.stanza_lines(stanza) for stanza in stanzas]
+        tails = [[line_tail(self[idx, self._alignment].n, size) for idx in
+                  idxs] for idxs in lines]
+        if workers > 1:
+            step = len(tails) // workers + 1
+            chunks = [tails[i:i + step] for i in range(0, len(tails), step)]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                clusters = list(itertools.chain.from_iterable(profiling.map(
+                    pool, _detect_all, chunks, [threshold] * len(chunks))))
+        else:
+            clusters = _detect_all(tails, threshold)
+
+        rhymeids = {idx: [0 for word in self[idx, self._line].n] for idx in
+                    self}
+        rhymeid = 0
+        for idxs, labels in zip(lines, clusters):
+            offset = rhymeid
+            for idx, label in zip(idxs, labels):
+                if label:
+                    rhymeids[idx][-1] = offset + label
+                    rhymeid = max(rhymeid, offset + label)
+        if ref in self.header:
+            for idx, value in rhymeids.items():
+                self[idx, ref] = self._cog_type(value)
+        else:
+            self.add_entries(ref, rhymeids, self._cog_type)
+        self._partitions.pop(ref, None)
+
+    @profiling.stage('get_connected_components',
+                     items=lambda result, poems, *args, **keywords: len(
+                         poems.comps))
+    def get_connected_components(self, ref='rhymeids'):
+        """
+        Group the rhyme words into connected components.
+
+        Notes
+        -----
+        The components are computed with a `RhymeComponents` forest fed from
+        the rhyme groups, so no rhyme network is needed. The forest is stored
+        in `self.rhyme_components` and kept up to date when poems are added.
+        """
+        self.rhyme_components = RhymeComponents.from_poems(self, ref=ref)
+        self.comps = self.rhyme_components.components()
 
+    @profiling.stage('pprint', items=_count_stanzas)
     def pprint(self, *stanzas, chords=False, tablefmt='pipe'):
-        rhymeids = []
+        from tabulate import tabulate
         if stanzas[0] == '*': stanzas = self.rows
-        for stanza in stanzas:
-            idxs = sorted(
-                self.get_list(row=stanza, flat=True),
-                key=lambda x: self[x, 'line_order']
-            )
-            for rhymeid in [self[idx, 'rhymeids'] for idx in idxs]:
-                rhymeids += [x for x in rhymeid if x]
-        rhymes = sorted(set(rhymeids), key=lambda x: rhymeids.index(x))
+        rhymes = self._rhyme_order(stanzas)
         table = []
         for stanza in stanzas:
-            idxs = sorted(
-                self.get_list(row=stanza, flat=True),
-                key=lambda x: self[x, 'line_order'])
+            idxs = self.stanza_lines(stanza)
             for idx in idxs:
                 if chords:
                     ctext = []
@@ -271,7 +1231,7 @@ class Poems(Alignments):
                         row += [[]]
                         for i, rhymeid in enumerate(self[idx, 'rhymeids']):
                             if rhymeid == rhyme:
-                                row[-1] += [self[idx, 'alignment'].n[i]]
+                                row[-1] += [self._rhyme_tokens(idx, i)]
                                 line[i] = '*' + line[i] + '*'
                         row[-1] = ' / '.join([str(x) for x in row[-1]])
                     else:
@@ -283,68 +1243,153 @@ class Poems(Alignments):
         table = [header] + table[:-1]
         print(tabulate(table, headers='firstrow', tablefmt=tablefmt))
 
-    def songbook(self, *poems, filename='poems.tex'):
-        """Export songs to latex songbook"""
+    def _song_lines(self, poem):
+        return [(self[idx, 'stanza'], self[idx, 'refrain'],
+                 [[str(syl) for syl in word] for word in self[idx, 'line'].n],
+                 list(self[idx, 'chords'])) for idx in self.poem_lines(poem)]
+
+    @profiling.stage('songbook', items=_count_poems)
+    def songbook(self, *poems, filename='poems.tex', workers=1, split=False):
+        """
+        Export songs to latex songbook.
 
-        text = ""
+        Parameters
+        ----------
+        workers : int (default=1)
+            Number of processes used for rendering the songs.
+        split : bool (default=False)
+            Write each song to a file of its own in a folder named after
+            `filename` and let `filename` include them. Song files whose
+            content did not change since the last export are not rewritten.
+        """
         meta = self._meta.get('poems', {})
         if poems[0] == '*':
             poems = self.cols
-        for poem in poems:
-            log.info('analyzing poem' + poem)
-            idxs = sorted(self.get_list(col=poem, flat=True),
-                          key=lambda x: (self[x, 'stanza'], self[x, 'line_order']))
-            text += r'\begin{{song}}{{{title}}}{{}}{{}}{{{author}}}{{}}{{}}'.format(
-                title=meta.get(poem, {}).get('title'),
-                author=meta.get(poem, {}).get('author')) + '\n'
-            stanza, before = '', ''
-            for idx in idxs:
-                new_stanza, refrain = self[idx, 'stanza'], self[idx, 'refrain']
-                if new_stanza != stanza:
-
-                    if before == 'verse':
-                        text += r'\end{SBVerse}' + '\n'
-                    elif before == 'refrain':
-                        text += r'\end{SBChorus}' + '\n'
-                    if refrain:
-                        text += r'\begin{SBChorus}' + '\n'
-                        before = 'refrain'
-                    else:
-                        before = 'verse'
-                        text += r'\begin{SBVerse}' + '\n'
-                    stanza = new_stanza
-                line = []
-                for word, chords in zip(self[idx, 'line'].n, self[idx, 'chords']):
-                    small_line = []
-                    for syl, chord in zip(word, chords.split()):
-                        syl = syl.replace('_', ' ')
-                        if chord.strip('_').strip():
-                            small_line += [r'\Ch{' + chord + '}{' + syl + '}']
-                        else:
-                            small_line += [syl]
-                    line += ['-'.join(small_line)]
-                text += ' '.join(line) + '\n\n'
-            if refrain:
-                text += r'\end{SBChorus}' + '\n'
-            else:
-                text += r'\end{SBVerse}' + '\n'
-            text += r'\end{song}' + '\n\n'
-        pathlib.Path(filename).write_text(text, encoding='utf8')
-        log.info('wrote file {0}'.format(filename))
+        songs = [(meta.get(poem, {}).get('title'),
+                  meta.get(poem, {}).get('author'),
+                  self._song_lines(poem)) for poem in poems]
+        if workers > 1 and songs:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                blocks = profiling.map(pool, _render_song, *zip(*songs),
+                                       chunksize=16)
+        else:
+            blocks = (_render_song(*song) for song in songs)
+
+        if not split:
+            with open(filename, 'w', encoding='utf8') as f:
+                for block in blocks:
+                    f.write(block)
+            log.info('wrote file {0}'.format(filename))
+            return
+
+        path = pathlib.Path(filename)
+        folder = path.parent.joinpath(path.stem)
+        folder.mkdir(exist_ok=True)
+        manifest = folder.joinpath('songs.json')
+        hashes = json.loads(manifest.read_text(encoding='utf8')) if \
+            manifest.exists() else {}
+        names, written = [], 0
+        for poem, block in zip(poems, blocks):
+            name = _song_name(poem)
+            digest = hashlib.sha256(block.encode('utf8')).hexdigest()
+            if hashes.get(name) != digest or not folder.joinpath(
+                    name + '.tex').exists():
+                folder.joinpath(name + '.tex').write_text(
+                    block, encoding='utf8')
+                hashes[name] = digest
+                written += 1
+            names += [name]
+        manifest.write_text(json.dumps(hashes, indent=2), encoding='utf8')
+        with open(filename, 'w', encoding='utf8') as f:
+            for name in names:
+                f.write('\\input{{{0}/{1}}}\n'.format(path.stem, name))
+        log.info('wrote file {0} ({1} of {2} songs changed)'.format(
+            filename, written, len(names)))
 
+    def _rhyme_order(self, stanzas):
+        """Return the rhyme ids of the stanzas in the order of appearance."""
+        rhymes = OrderedDict()
+        for stanza in stanzas:
+            for idx in self.stanza_lines(stanza):
+                for rhymeid in self[idx, 'rhymeids']:
+                    if rhymeid:
+                        rhymes[rhymeid] = True
+        return list(rhymes)
+
+    def _html_rows(self, stanzas, rhymes, colors, alignment=False,
+                   chords=False):
+        """Yield the rows of the HTML table, stanzas separated by a row."""
+        from lingpy.convert.html import tokens2html
+        columns = {rhyme: i for i, rhyme in enumerate(rhymes)}
+        for stanza in stanzas:
+            for idx in self.stanza_lines(stanza):
+                if chords:
+                    yield ['<span>{0}</span>'.format(
+                        chord) for chord in self[idx, 'chords']]
+                cells = OrderedDict()
+                line = [str(x) for x in self[idx, 'line'].n]
+                for i, rhymeid in enumerate(self[idx, 'rhymeids']):
+                    if rhymeid in columns:
+                        cells.setdefault(rhymeid, []).append(
+                            tokens2html(self._rhyme_tokens(idx, i)))
+                        line[i] = '<span style="color:white;background-color:{0};font-weight:bold;">'.format(
+                            colors[rhymeid]) + line[i] + '</span>'
+                row = [idx, stanza, ' '.join(line)]
+                if alignment:
+                    row += ['' for rhyme in rhymes]
+                    for rhymeid, cell in cells.items():
+                        row[3 + columns[rhymeid]] = ' '.join(cell)
+                yield row
+            yield len(row) * ['<span style="color:white">.</span>']
+
+    def _html_pages(self, stanzas, pages):
+        if not pages:
+            return [('', stanzas)]
+        if pages == 'poem':
+            poems = OrderedDict()
+            for stanza in stanzas:
+                poem = self[self.stanza_lines(stanza)[0], self._poem]
+                poems.setdefault(poem, []).append(stanza)
+            return list(poems.items())
+        chunks = [stanzas[i:i + pages] for i in range(0, len(stanzas), pages)]
+        return [('{0}–{1}'.format(chunk[0], chunk[-1]), chunk) for chunk in
+                chunks]
+
+    def _write_html(self, filename, stanzas, colors, alignment, chords):
+        rhymes = self._rhyme_order(stanzas)
+        header = ['ID', 'STANZA', 'LINE']
+        if alignment:
+            header += ['R:{0}'.format(x) for x in rhymes]
+        with open(filename, 'w', encoding='utf8') as f:
+            f.write(_HTML_HEAD + '<body><table>\n<tbody>\n')
+            f.write(_html_row(header))
+            pending = None
+            for row in self._html_rows(stanzas, rhymes, colors,
+                                       alignment=alignment, chords=chords):
+                if pending:
+                    f.write(pending)
+                pending = _html_row(row)
+            f.write('</tbody>\n</table></body></html>')
+
+    @profiling.stage('html', items=_count_stanzas)
     def html(self, *stanzas, filename='output.html', alignment=False,
-             chords=False):
-        rhymeids = []
+             chords=False, stream=False, pages=None):
+        """
+        Write the stanzas with highlighted rhymes to an HTML file.
+
+        Parameters
+        ----------
+        stream : bool (default=False)
+            Write the rows to the file one by one instead of building the
+            whole table in memory.
+        pages : { None, "poem", int } (default=None)
+            Write the stanzas of each poem, or each N stanzas, to a page of
+            their own, named after `filename` with the number of the page,
+            and write an index of the pages to `filename`. Implies `stream`.
+        """
+        from lingpy.convert.html import colorRange
         if stanzas[0] == '*': stanzas = self.rows
-        for stanza in stanzas:
-            idxs = sorted(
-                self.get_list(row=stanza, flat=True),
-                key=lambda x: self[x, 'line_order']
-            )
-            for rhymeid in [self[idx, 'rhymeids'] for idx in idxs]:
-                rhymeids += [x for x in rhymeid if x]
-
-        rhymes = sorted(set(rhymeids), key=lambda x: rhymeids.index(x))
+        rhymes = self._rhyme_order(stanzas)
         colors_ = colorRange(len(rhymes) + 5)
         colors = []
         for i, (a, b) in enumerate(zip(colors_, colors_[::-1])):
@@ -352,155 +1397,143 @@ class Poems(Alignments):
                 colors += [a]
             else:
                 colors += [b]
+        colors = dict(zip(rhymes, colors))
 
-        table = []
-        for stanza in stanzas:
-            idxs = sorted(
-                self.get_list(row=stanza, flat=True),
-                key=lambda x: self[x, 'line_order'])
-            for idx in idxs:
-                if chords:
-                    table += [['<span>{0}</span>'.format(
-                        chord) for chord in self[idx, 'chords']]]
-                row = []
-                line = [str(x) for x in self[idx, 'line'].n]
-                for color, rhyme in zip(colors, rhymes):
-                    if rhyme in self[idx, 'rhymeids']:
-                        row += [[]]
-                        for i, rhymeid in enumerate(self[idx, 'rhymeids']):
-                            if rhymeid == rhyme:
-                                row[-1] += [tokens2html(self[idx,
-                                                             'alignment'].n[i])]
-                                line[i] = '<span style="color:white;background-color:{0};font-weight:bold;">'.format(
-                                    color) + line[i] + '</span>'
-                        row[-1] = ' '.join([str(x) for x in row[-1]])
-                    else:
-                        row += ['']
-
-                table += [[idx, stanza, ' '.join(line)]]
-                if alignment:
-                    table[-1] += row
-            table += [len(table[-1]) * ['<span style="color:white">.</span>']]
+        if stream and not pages:
+            return self._write_html(filename, stanzas, colors, alignment,
+                                    chords)
+        if pages:
+            path = pathlib.Path(filename)
+            with open(filename, 'w', encoding='utf8') as f:
+                f.write(_HTML_HEAD + '<body><ul>\n')
+                for i, (label, page) in enumerate(
+                        self._html_pages(stanzas, pages)):
+                    name = '{0}-{1}{2}'.format(path.stem, i + 1, path.suffix)
+                    self._write_html(str(path.parent.joinpath(name)), page,
+                                     colors, alignment, chords)
+                    f.write('<li><a href="{0}">{1}</a></li>\n'.format(
+                        name, label))
+                f.write('</ul></body></html>')
+            return
 
+        table = list(self._html_rows(stanzas, rhymes, colors,
+                                     alignment=alignment, chords=chords))
         header = ['ID', 'STANZA', 'LINE']
         if alignment: header += ['R:{0}'.format(x) for x in rhymes]
 
         table = [header] + table[:-1]
+        from tabulate import tabulate
         with open(filename, 'w') as f:
-            f.write('<html><head><meta http-equiv="content-type"'
-                    ' content="text/html; charset=utf-8" /></head>')
+            f.write(_HTML_HEAD)
             f.write('<body>' + tabulate(table, tablefmt='html') + '</body></html>')
 
-    def compare(self, other, *stanzas):
+    def partitions(self, ref=None):
+        """
+        Return the rhyme partitions of all stanzas, computed once per column.
+        """
+        ref = ref or self._ref
+        self._check_index()
+        if ref not in self._partitions:
+            self._partitions[ref] = {
+                stanza: normalize([self[idx, ref] for idx in idxs]) for
+                stanza, idxs in self._stanza_index.items()}
+        return self._partitions[ref]
 
-        p, r, f, count, hits, missed = [], [], [], 0, 0, 0
-        diffs = []
-        if stanzas[0] == '*':
+    @profiling.stage('evaluate', items=lambda result, *args, **keywords: len(
+        result['stanzas']))
+    def evaluate(self, other, *stanzas, ref=None, other_ref=None):
+        """
+        Compare the rhyme annotation of the stanzas with another collection.
+
+        Returns
+        -------
+        results : dict
+            The per-stanza and averaged B-cubed scores along with the lists
+            of differing stanzas (see `poepy.evaluate.score`).
+        """
+        if not stanzas or stanzas[0] == '*':
             stanzas = self.rows
-        for stanza in stanzas:
-            if not stanza in other.rows:
-                missed += 1
-            else:
-                idxsA = sorted(self.get_list(row=stanza, flat=True),
-                               key=lambda x: self[x, 'line_order'])
-                idxsB = sorted(other.get_list(row=stanza, flat=True),
-                               key=lambda x: other[x, 'line_order'])
-                if len(idxsA) == len(idxsB):
-                    count += 1
-                    rhymesA, dictA, cogid = [], {}, 1
-                    for idx in idxsA:
-                        rhymeids = self[idx, 'rhymeids']
-                        found = False
-                        for rhymeid in rhymeids:
-                            if rhymeid:
-                                if rhymeid not in dictA:
-                                    dictA[rhymeid] = cogid
-                                    cogid += 1
-                                rhymesA += [dictA[rhymeid]]
-                                found = True
-                                break
-                        if not found:
-                            rhymesA += [cogid]
-                            cogid += 1
-
-                    rhymesB, dictB, cogid = [], {}, 1
-                    for idx in idxsB:
-                        rhymeids = other[idx, 'rhymeids']
-                        found = False
-                        for rhymeid in rhymeids:
-                            if rhymeid:
-                                if rhymeid not in dictB:
-                                    dictB[rhymeid] = cogid
-                                    cogid += 1
-                                rhymesB += [dictB[rhymeid]]
-                                found = True
-                                break
-                        if not found:
-                            rhymesB += [cogid]
-                            cogid += 1
-                    if rhymesA == rhymesB:
-                        hits += 1
-
-                    if len(rhymesA) == len(rhymesB) and rhymesA:
-                        p += [_get_bcubed_score(rhymesA, rhymesB)]
-                        r += [_get_bcubed_score(rhymesB, rhymesA)]
-                        f += [2 * (p[-1] * r[-1]) / (p[-1] + r[-1])]
-                        if f[-1] != 1:
-                            diffs += [stanza]
-                    else:
-                        print(rhymesA)
-                        print(rhymesB)
-                        print('---', stanza, '---')
-        print(hits / count, hits, count)
+        return score(self.partitions(ref), other.partitions(other_ref),
+                     stanzas)
+
+    @profiling.stage('compare')
+    def compare(self, other, *stanzas, ref=None, other_ref=None):
+        """Print the evaluation of the stanzas and return the differences."""
+        from lingpy.evaluate.acd import _format_results
+        results = self.evaluate(other, *stanzas, ref=ref, other_ref=other_ref)
+        print(results['hits'] / results['count'], results['hits'],
+              results['count'])
         print(_format_results(
             'bcubes',
-            sum(p) / len(p),
-            sum(r) / len(r),
-            sum(f) / len(f)))
-        print(len(p), self.height, other.height)
-        return diffs
-
-    def text(self, filename, poem):
-
-        base = ''
-        idxs = self.get_list(col=poem)
-        for key, val in self._meta['poems'][poem].items():
-            base += '@' + key.upper() + ': ' + val + '\n'
-
-        _rhymes = 'abcdefghijklmnopqrstuvwxyz'
-        rhymes = list(_rhymes)
-        rhymes += list(_rhymes.upper())
-        rhymes += [a + a for a in _rhymes]
-        rhymes += [a + a for a in _rhymes.upper()]
-        rhymes += [a + a + a for a in _rhymes]
-        rhymes += [a + a + a for a in _rhymes.upper()]
-
-        rhymeids = sorted(self.get_etymdict(ref='rhymeids'))[1:]
-
-        stanza = ''
-        for idx in idxs:
-            line = ''
-            current_stanza = self[idx, 'stanza']
-            if current_stanza != stanza:
-                stanza = current_stanza
-                base += '\n'
-            for i, (word, rhyme) in enumerate(zip(
-                    self[idx, 'line'].n,
-                    self[idx, 'rhymeids'])):
-                if rhyme:
-                    # get the rhyme number
-                    try:
-                        rhyme = rhymes[rhymeids.index(rhyme)]
-                    except IndexError:
-                        rhyme = str(rhyme)
-                    rhyme = '[' + rhyme + ']'
-                else:
-                    rhyme = ''
-                line += ' ' + rhyme + str(word)
-            if self[idx, 'refrain']:
-                line = ' ' + line + '\n'
-            else:
-                line = line.strip() + '\n'
-            base += line
-        with open(filename, 'w') as f:
-            f.write(base)
+            results['precision'],
+            results['recall'],
+            results['fscore']))
+        print(len(results['stanzas']), self.height, other.height)
+        return results['diffs']
+
+    def _text_lines(self, poem):
+        lines = []
+        for idx in sorted(self.poem_lines(poem), key=lambda x: (
+                _stanza_key(self[x, self._stanza]), self[x, 'line_order'])):
+            words = [[str(t) for t in word] for word in self[idx, self._line].n]
+            if not words:
+                continue
+            lines.append((
+                self[idx, self._stanza],
+                self[idx, 'refrain'] if 'refrain' in self.header else '',
+                words,
+                list(self[idx, self._ref]),
+                [[str(t) for t in word] for word in self[
+                    idx, self._alignment].n],
+                list(self[idx, 'chords']) if 'chords' in self.header else
+                ['_' for word in words]))
+        return lines
+
+    @profiling.stage('text', items=lambda result, poems, filename, *names,
+                     **keywords: _count_poems(result, poems, *names))
+    def text(self, filename, *poems, workers=1, split=False):
+        """
+        Write poems in the annotated text format.
+
+        Parameters
+        ----------
+        poems : str
+            The poems to write, all poems if none or "*" is given.
+        workers : int (default=1)
+            Number of processes used for rendering the poems.
+        split : bool (default=False)
+            Write each poem to a file of its own in a folder named after
+            `filename` instead of writing all poems to `filename`.
+
+        Notes
+        -----
+        Reading the output of a collection parsed from the text format with
+        `parser` gives the same lines, words, alignments, chords, refrains,
+        stanzas and metadata, with the rhyme ids of each poem numbered in the
+        order of their appearance, so the export can be used to normalize
+        files.
+        """
+        meta = self._meta.get('poems', {})
+        if not poems or poems[0] == '*':
+            poems = sorted(self.cols, key=lambda x: _stanza_key(
+                self[self.poem_lines(x)[0], self._stanza]))
+        texts = [(poem, meta.get(poem), self._text_lines(poem)) for poem in
+                 poems]
+        if workers > 1 and texts:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                blocks = profiling.map(pool, _render_text, *zip(*texts),
+                                       chunksize=16)
+        else:
+            blocks = (_render_text(*text) for text in texts)
+
+        if not split:
+            with open(filename, 'w', encoding='utf8') as f:
+                for block in blocks:
+                    f.write(block)
+            return
+        path = pathlib.Path(filename)
+        folder = path.parent.joinpath(path.stem)
+        folder.mkdir(parents=True, exist_ok=True)
+        for poem, block in zip(poems, blocks):
+            folder.joinpath(_song_name(poem) + '.txt').write_text(
+                block, encoding='utf8')
@@ -0,0 +1,206 @@
+"""
+Stage timings for the processing pipeline of poepy.
+
+Notes
+-----
+Functions decorated with `stage` record their wall time, number of calls
+and number of processed items while profiling is enabled. When it is
+disabled, a staged call costs one extra function call and a flag check::
+
+    >>> from poepy import parser, profiling
+    >>> with profiling.profiled():
+    ...     poe = parser('poems.txt')
+    >>> print(profiling.report())
+
+Worker processes started with `map` send their timings back to the parent,
+where they are added to the registry.
+"""
+import os
+import time
+import logging
+import cProfile
+import functools
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+_enabled = False
+_profile_dir = None
+_depth = 0
+_dumps = 0
+
+# stage name -> [calls, seconds, items]
+_stages = {}
+
+
+def enable(profile_dir=None):
+    """
+    Start recording stage timings.
+
+    Parameters
+    ----------
+    profile_dir : str (default=None)
+        If given, each outermost staged call is run under cProfile and its
+        statistics are dumped to a file in this folder.
+    """
+    global _enabled, _profile_dir
+    _enabled, _profile_dir = True, profile_dir
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+
+
+def disable():
+    global _enabled, _profile_dir
+    _enabled, _profile_dir = False, None
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    _stages.clear()
+
+
+@contextmanager
+def profiled(profile_dir=None):
+    """Record stage timings from scratch inside a `with` block."""
+    reset()
+    enable(profile_dir)
+    try:
+        yield
+    finally:
+        disable()
+
+
+def record(name, seconds, items=0, calls=1):
+    stats = _stages.setdefault(name, [0, 0.0, 0])
+    stats[0] += calls
+    stats[1] += seconds
+    stats[2] += items
+
+
+def _dump(profile, name):
+    global _dumps
+    _dumps += 1
+    profile.dump_stats(os.path.join(_profile_dir, '{0}-{1}-{2}.prof'.format(
+        name, os.getpid(), _dumps)))
+
+
+def _call(name, func, items, dump, args, keywords):
+    global _depth
+    profile = cProfile.Profile() if (
+        _profile_dir and dump and not _depth) else None
+    _depth += 1
+    start = time.perf_counter()
+    try:
+        if profile:
+            result = profile.runcall(func, *args, **keywords)
+        else:
+            result = func(*args, **keywords)
+    finally:
+        _depth -= 1
+    seconds = time.perf_counter() - start
+    count = 0
+    if items:
+        # counting must never change the outcome of the call
+        try:
+            count = items(result, *args, **keywords)
+        except Exception as e:
+            log.warning('could not count the items of stage {0}: {1}'.format(
+                name, e))
+    record(name, seconds, count)
+    if profile:
+        _dump(profile, name)
+    return result
+
+
+def stage(name, items=None, dump=True):
+    """
+    Decorate a function as a stage of the pipeline.
+
+    Parameters
+    ----------
+    name : str
+        The name under which the stage is recorded.
+    items : callable (default=None)
+        Called with the result and the arguments of the function to count
+        the items processed by a call. Errors raised by it are logged and
+        the call is recorded with zero items.
+    dump : bool (default=True)
+        Whether the stage may be dumped with cProfile. Switch this off for
+        stages which are called once per line.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **keywords):
+            if not _enabled:
+                return func(*args, **keywords)
+            return _call(name, func, items, dump, args, keywords)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def section(name, items=0):
+    """Record the code in a `with` block as a stage."""
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start, items)
+
+
+class _Worker(object):
+    """Run a function in a worker process and return its stage timings."""
+
+    def __init__(self, func, profile_dir):
+        self.func, self.profile_dir = func, profile_dir
+
+    def __call__(self, *args):
+        enable(self.profile_dir)
+        reset()
+        try:
+            return self.func(*args), dict(_stages)
+        finally:
+            disable()
+
+
+def map(pool, func, *iterables, **keywords):
+    """
+    Map a function over the iterables with a process pool.
+
+    Notes
+    -----
+    When profiling is enabled, the stage timings of the workers are added to
+    the registry of the calling process.
+    """
+    if not _enabled:
+        return list(pool.map(func, *iterables, **keywords))
+    results = []
+    for result, stages in pool.map(_Worker(func, _profile_dir), *iterables,
+                                   **keywords):
+        for name, (calls, seconds, items) in stages.items():
+            record(name, seconds, items, calls)
+        results.append(result)
+    return results
+
+
+def results():
+    """Return the recorded stages as a dictionary."""
+    return {name: {'calls': calls, 'seconds': seconds, 'items': items} for
+            name, (calls, seconds, items) in _stages.items()}
+
+
+def report():
+    """Return the recorded stages as a table sorted by time."""
+    lines = ['{0:30} {1:>8} {2:>10} {3:>10}'.format(
+        'STAGE', 'CALLS', 'SECONDS', 'ITEMS')]
+    for name, (calls, seconds, items) in sorted(
+            _stages.items(), key=lambda x: -x[1][1]):
+        lines.append('{0:30} {1:8} {2:10.4f} {3:10}'.format(
+            name, calls, seconds, items))
+    return '\n'.join(lines)
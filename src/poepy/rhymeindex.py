@@ -0,0 +1,122 @@
+"""
+Inverted index of rhyme words with a trie over their reversed sounds.
+"""
+import pickle
+from array import array
+from collections import Counter
+
+
+def segments(word):
+    """
+    Return the sound segments of a rhyme word.
+
+    Notes
+    -----
+    Rhyme words which are not segmented (like the reconstructed rimes in
+    the Chinese data) are split into characters.
+    """
+    if isinstance(word, str):
+        word = word.split()
+    word = [str(t) for t in word]
+    if len(word) == 1:
+        return list(word[0])
+    return word
+
+
+class RhymeIndex(object):
+    """
+    Index of the rhyme words of a collection.
+
+    Notes
+    -----
+    Each rhyme word is stored with the ids of the lines it occurs in, its
+    rhyme partners sorted by frequency, and in a trie over its reversed
+    segments. Each node of the trie lists all words below it, so that all
+    queries only touch the words they return.
+    """
+
+    def __init__(self):
+        self.words, self._word_idx = [], {}
+        self.occurrences, self.partners = [], []
+        self.lines = {}
+        self.trie = {'words': [], 'children': {}}
+
+    def _word(self, word):
+        try:
+            return self._word_idx[word]
+        except KeyError:
+            self._word_idx[word] = len(self.words)
+            self.words.append(word)
+            self.occurrences.append(array('i'))
+            self.partners.append(Counter())
+            node = self.trie
+            node['words'].append(self._word_idx[word])
+            for segment in reversed(segments(word)):
+                node = node['children'].setdefault(
+                    segment, {'words': [], 'children': {}})
+                node['words'].append(self._word_idx[word])
+            return self._word_idx[word]
+
+    @classmethod
+    def from_poems(cls, poems, ref='rhymeids'):
+        index = cls()
+        groups = {}
+        for idx in poems:
+            rhymeids = poems[idx, ref]
+            index.lines[idx] = (poems[idx, poems._poem],
+                                poems[idx, poems._stanza])
+            if not any(rhymeids):
+                continue
+            words = poems[idx, poems._alignment].n
+            for rhymeid, word in zip(rhymeids, words):
+                if rhymeid:
+                    node = index._word(' '.join(str(x) for x in word))
+                    index.occurrences[node].append(idx)
+                    groups.setdefault(rhymeid, []).append(node)
+        for nodes in groups.values():
+            for i, nodeA in enumerate(nodes):
+                for j, nodeB in enumerate(nodes):
+                    if i != j:
+                        index.partners[nodeA][nodeB] += 1
+        index.partners = [
+            [(node, count) for node, count in partners.most_common()]
+            for partners in index.partners]
+        return index
+
+    def _key(self, word):
+        return word if isinstance(word, str) else ' '.join(word)
+
+    def occurrences_of(self, word):
+        """Return `(poem, stanza, line)` for each occurrence of a word."""
+        node = self._word_idx.get(self._key(word))
+        if node is None:
+            return []
+        return [self.lines[idx] + (idx, ) for idx in self.occurrences[node]]
+
+    def tails(self, word, k):
+        """Return all words which share the last `k` segments with a word."""
+        node = self.trie
+        for segment in reversed(segments(self._key(word))[-k:]):
+            if segment not in node['children']:
+                return []
+            node = node['children'][segment]
+        return [self.words[i] for i in node['words']]
+
+    def partners_of(self, word, n=10):
+        """Return the `n` most frequent rhyme partners of a word."""
+        node = self._word_idx.get(self._key(word))
+        if node is None:
+            return []
+        return [(self.words[i], count) for i, count in
+                self.partners[node][:n]]
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self.__dict__, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with open(path, 'rb') as f:
+            index.__dict__.update(pickle.load(f))
+        return index
@@ -0,0 +1,141 @@
+"""
+Rhyme schemes of stanzas and an index for retrieving stanzas by scheme.
+"""
+import pickle
+
+from poepy.data import rhyme_label
+from poepy.statistics import _reader
+
+
+def scheme(lines):
+    """
+    Return the rhyme scheme of a stanza.
+
+    Parameters
+    ----------
+    lines : list
+        The rhyme ids and the refrain flag of each line of the stanza, as
+        tuples `(rhymeids, refrain)`.
+
+    Returns
+    -------
+    scheme : tuple
+        One symbol per line. Rhymes are lettered A, B, C, ... in the order
+        of their appearance, lines without rhyme are written `x`, lines with
+        several rhyme positions list their letters in brackets, like
+        `(AB)`, and refrain lines are marked by a trailing `'`.
+    """
+    symbols, letters = [], {}
+    for rhymeids, refrain in lines:
+        line = []
+        for rhymeid in rhymeids:
+            if rhymeid:
+                if rhymeid not in letters:
+                    letters[rhymeid] = rhyme_label(
+                        len(letters) + 1, upper=True)
+                if letters[rhymeid] not in line:
+                    line.append(letters[rhymeid])
+        symbol = 'x' if not line else line[0] if len(line) == 1 else \
+            '(' + ''.join(line) + ')'
+        symbols.append(symbol + ("'" if refrain else ''))
+    return tuple(symbols)
+
+
+def _symbols(pattern):
+    """Split a scheme string like `AB(AB)x'` into the symbols of its lines."""
+    if not isinstance(pattern, str):
+        return tuple(pattern)
+    symbols, i = [], 0
+    while i < len(pattern):
+        j = pattern.index(')', i) + 1 if pattern[i] == '(' else i + 1
+        while j < len(pattern) and pattern[j] == "'":
+            j += 1
+        symbols.append(pattern[i:j])
+        i = j
+    return tuple(symbols)
+
+
+class SchemeIndex(object):
+    """
+    Index of the stanzas of a collection by their rhyme scheme.
+
+    Notes
+    -----
+    Stanzas are indexed by their full scheme and by each prefix of their
+    scheme, and poems by the values of their metadata, so that all queries
+    are answered with dictionary lookups.
+    """
+
+    def __init__(self):
+        self.schemes, self.poems = {}, {}
+        self.patterns, self.prefixes, self.meta = {}, {}, {}
+        self.key = None
+
+    def add(self, stanza, poem, symbols):
+        self.schemes[stanza], self.poems[stanza] = ''.join(symbols), poem
+        self.patterns.setdefault(self.schemes[stanza], []).append(stanza)
+        for i in range(1, len(symbols) + 1):
+            self.prefixes.setdefault(''.join(symbols[:i]), []).append(stanza)
+
+    @classmethod
+    def from_poems(cls, poems, ref=None):
+        index = cls()
+        ref = ref or poems._ref
+        rhymeids = _reader(poems, ref, False)
+        refrains = 'refrain' in poems.header
+        poems._check_index()
+        for stanza, idxs in poems._stanza_index.items():
+            index.add(stanza, poems[idxs[0], poems._poem], scheme([
+                (rhymeids(idx) or [], poems[idx, 'refrain'] if refrains else
+                 '') for idx in idxs]))
+        for poem, meta in poems._meta.get('poems', {}).items():
+            for key, value in meta.items():
+                index.meta.setdefault((key, str(value)), set()).add(poem)
+        return index
+
+    def find(self, pattern, prefix=False, poems=None, where=None):
+        """
+        Return the stanzas with a rhyme scheme.
+
+        Parameters
+        ----------
+        pattern : str
+            The scheme, like `ABAB` or `AABx'`.
+        prefix : bool (default=False)
+            Return all stanzas whose schemes start with the pattern.
+        poems : list (default=None)
+            Restrict the search to these poems.
+        where : dict (default=None)
+            Values of metadata fields the poems must have, given as single
+            values or lists of values, of which one must match.
+        """
+        pattern = ''.join(_symbols(pattern))
+        stanzas = (self.prefixes if prefix else self.patterns).get(
+            pattern, [])
+        selected = None if poems is None else set(poems)
+        for key, values in (where or {}).items():
+            matches = set()
+            for value in (values if isinstance(values, (list, tuple, set))
+                          else [values]):
+                matches |= self.meta.get((key, str(value)), set())
+            selected = matches if selected is None else selected & matches
+        if selected is None:
+            return list(stanzas)
+        return [stanza for stanza in stanzas if self.poems[stanza] in
+                selected]
+
+    def counts(self):
+        """Return the number of stanzas for each scheme, most frequent first."""
+        return sorted(((pattern, len(stanzas)) for pattern, stanzas in
+                       self.patterns.items()), key=lambda x: (-x[1], x[0]))
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self.__dict__, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with open(path, 'rb') as f:
+            index.__dict__.update(pickle.load(f))
+        return index
@@ -0,0 +1,155 @@
+"""
+Statistics of a collection computed in one pass and aggregated per poem.
+"""
+from collections import Counter
+
+
+def _reader(poems, column, tokens):
+    """Return a function reading a list-valued column of a line."""
+    idx = poems.header.get(poems._alias.get(column))
+    store = (poems._compact or {}).get(idx)
+    if store is not None:
+        data = poems._data
+        plus = store.codes.get('+') if tokens else None
+
+        def read(line):
+            # cells assigned after compacting are kept in the rows
+            cell = data[line][idx]
+            if cell is not None:
+                return len(cell.n) if tokens else cell
+            codes = store.get(line)
+            return codes.count(plus) + 1 if tokens else codes
+        return read
+    if idx is None:
+        return lambda line: None
+    if tokens:
+        return lambda line: len(poems[line, column].n)
+    return lambda line: poems[line, column]
+
+
+def _chorded(chords):
+    return sum(1 for chord in chords if chord.replace('_', '').strip())
+
+
+class Statistics(object):
+    """
+    Aggregates of the poems of a collection.
+
+    Notes
+    -----
+    The lines are read once, directly from the compact columns if the
+    collection is compacted, and counted for each poem. Statistics of all
+    poems or of a subset of them are computed from these counts, without
+    reading the lines again.
+    """
+
+    def __init__(self):
+        self.poems, self.meta = {}, {}
+
+    @classmethod
+    def from_poems(cls, poems):
+        stats = cls()
+        stats.meta = dict(poems._meta.get('poems', {}))
+        rhymeids = _reader(poems, poems._ref, False)
+        words = _reader(poems, poems._line, True)
+        has_refrain = 'refrain' in poems.header
+        has_chords = 'chords' in poems.header
+        for idx in poems:
+            poem = poems[idx, poems._poem]
+            stanza = poems[idx, poems._stanza]
+            try:
+                counts = stats.poems[poem]
+            except KeyError:
+                counts = stats.poems[poem] = {
+                    'lines': 0, 'words': 0, 'refrain_lines': 0,
+                    'chord_words': 0, 'rhymes': Counter(), 'stanzas': {}}
+            counts['lines'] += 1
+            counts['words'] += words(idx)
+            line_rhymes = [x for x in rhymeids(idx) or [] if x]
+            counts['rhymes'].update(line_rhymes)
+            counts['stanzas'][stanza] = counts['stanzas'].get(
+                stanza, 0) + len(line_rhymes)
+            if has_refrain and poems[idx, 'refrain']:
+                counts['refrain_lines'] += 1
+            if has_chords:
+                counts['chord_words'] += _chorded(poems[idx, 'chords'] or [])
+        return stats
+
+    def select(self, poems=None, where=None):
+        """
+        Return the poems matching a selection.
+
+        Parameters
+        ----------
+        poems : list (default=None)
+            The poems to select, all poems if not given.
+        where : dict (default=None)
+            Values of metadata fields of the poems, given as single values
+            or lists of values, of which one must match.
+        """
+        selected = list(self.poems) if poems is None else [
+            poem for poem in poems if poem in self.poems]
+        for key, values in (where or {}).items():
+            values = set(str(x) for x in (values if isinstance(
+                values, (list, tuple, set)) else [values]))
+            selected = [poem for poem in selected if str(
+                self.meta.get(poem, {}).get(key)) in values]
+        return selected
+
+    def summary(self, poems=None, where=None):
+        """
+        Return the statistics of a selection of poems as a dictionary.
+
+        Notes
+        -----
+        Rhyme groups are counted within the selection, so that groups with
+        only one rhyme word in the selected poems do not count as rhymes.
+        """
+        selected = self.select(poems, where)
+        rhymes, stanzas, lines_per_poem = Counter(), {}, {}
+        lines = words = refrain_lines = chord_words = 0
+        for poem in selected:
+            counts = self.poems[poem]
+            lines += counts['lines']
+            words += counts['words']
+            refrain_lines += counts['refrain_lines']
+            chord_words += counts['chord_words']
+            rhymes.update(counts['rhymes'])
+            for stanza, count in counts['stanzas'].items():
+                stanzas[stanza] = stanzas.get(stanza, 0) + count
+            lines_per_poem[poem] = counts['lines']
+        groups = [size for size in rhymes.values() if size > 1]
+        return {
+            'poems': len(selected),
+            'stanzas': len(stanzas),
+            'lines': lines,
+            'words': words,
+            'rhymes': len(groups),
+            'rhyme_words': sum(groups),
+            'group_sizes': dict(sorted(Counter(groups).items())),
+            'rhyme_words_per_stanza': dict(sorted(Counter(
+                stanzas.values()).items())),
+            'lines_per_poem': lines_per_poem,
+            'refrain_ratio': refrain_lines / lines if lines else 0.0,
+            'chord_coverage': chord_words / words if words else 0.0}
+
+    def breakdown(self, key, poems=None, where=None):
+        """Return the statistics for each value of a metadata field."""
+        groups = {}
+        for poem in self.select(poems, where):
+            groups.setdefault(self.meta.get(poem, {}).get(key), []).append(
+                poem)
+        return {value: self.summary(members) for value, members in
+                groups.items()}
+
+    def table(self, poems=None, where=None):
+        """
+        Return one record per poem, for example to build a data frame.
+        """
+        return [dict(
+            [('poem', poem)] + list(self.meta.get(poem, {}).items()) + [
+                (name, self.poems[poem][name]) for name in (
+                    'lines', 'words', 'refrain_lines', 'chord_words')] + [
+                ('stanzas', len(self.poems[poem]['stanzas'])),
+                ('rhyme_words', sum(self.poems[poem]['rhymes'].values()))])
+            for poem in self.select(poems, where)]
@@ -0,0 +1,174 @@
+"""
+Store collections of poems in SQLite databases.
+
+Notes
+-----
+A store has one table for poems, stanzas, lines and rhyme memberships each,
+plus a table with the metadata of the poems as key-value pairs. Stanzas are
+stored with their rhyme scheme. Poems, stanzas, schemes, rhyme ids and
+metadata are indexed, so that loading a selection only reads the matching
+lines. Stores are opened read-only for loading, so several processes can
+read the same store at the same time.
+"""
+import os
+import json
+import pathlib
+import sqlite3
+
+from lingpy import basictypes
+
+from poepy.schemes import SchemeIndex, _symbols
+
+_SCHEMA = """
+CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE poems (id INTEGER PRIMARY KEY, title TEXT UNIQUE, meta TEXT);
+CREATE TABLE poem_meta (poem_id INTEGER, key TEXT, value TEXT);
+CREATE TABLE stanzas (id INTEGER PRIMARY KEY, poem_id INTEGER, stanza TEXT,
+    scheme TEXT, UNIQUE (poem_id, stanza));
+CREATE TABLE lines (id INTEGER PRIMARY KEY, stanza_id INTEGER,
+    line_order INTEGER, data TEXT);
+CREATE TABLE rhymes (rhymeid INTEGER, line_id INTEGER, position INTEGER);
+CREATE INDEX poem_meta_key ON poem_meta (key, value);
+CREATE INDEX stanzas_stanza ON stanzas (stanza);
+CREATE INDEX stanzas_scheme ON stanzas (scheme);
+CREATE INDEX lines_stanza ON lines (stanza_id, line_order);
+CREATE INDEX rhymes_rhymeid ON rhymes (rhymeid);
+"""
+
+# keywords of `Poems` which name the columns of a collection
+SETTINGS = ('ref', 'line', 'poem', 'stanza', 'alignment', 'line_in_source')
+
+
+def _encode(cell):
+    if isinstance(cell, basictypes.lists):
+        return str(cell)
+    if isinstance(cell, basictypes._strings):
+        return list(cell) if cell._type is int else str(cell)
+    if isinstance(cell, list):
+        return list(cell)
+    return cell
+
+
+def write(poems, path):
+    """Write a collection to a new store, replacing an existing file."""
+    if os.path.exists(path):
+        os.remove(path)
+    header = sorted(poems.header, key=lambda x: poems.header[x])
+    settings = dict(zip(SETTINGS, (
+        poems._ref, poems._line, poems._poem, poems._stanza,
+        poems._alignment, poems._transcription)))
+    meta = poems._meta.get('poems', {})
+    order = poems.header.get('line_order')
+    schemes = SchemeIndex.from_poems(poems).schemes
+    db = sqlite3.connect(path)
+    try:
+        with db:
+            db.executescript(_SCHEMA)
+            db.executemany('INSERT INTO settings VALUES (?, ?)', [
+                ('header', json.dumps(header)),
+                ('settings', json.dumps(settings))])
+            poem_ids, stanza_ids = {}, {}
+            for idx in poems:
+                row = poems[idx]
+                poem, stanza = row[poems.header[poems._poem]], \
+                    row[poems.header[poems._stanza]]
+                if poem not in poem_ids:
+                    poem_ids[poem] = len(poem_ids) + 1
+                    db.execute('INSERT INTO poems VALUES (?, ?, ?)', (
+                        poem_ids[poem], poem, json.dumps(meta[poem]) if
+                        poem in meta else None))
+                    db.executemany('INSERT INTO poem_meta VALUES (?, ?, ?)', [
+                        (poem_ids[poem], key, str(value)) for key, value in
+                        meta.get(poem, {}).items()])
+                if (poem, stanza) not in stanza_ids:
+                    stanza_ids[poem, stanza] = len(stanza_ids) + 1
+                    db.execute('INSERT INTO stanzas VALUES (?, ?, ?, ?)', (
+                        stanza_ids[poem, stanza], poem_ids[poem], stanza,
+                        schemes.get(stanza)))
+                db.execute('INSERT INTO lines VALUES (?, ?, ?, ?)', (
+                    idx, stanza_ids[poem, stanza],
+                    row[order] if order is not None else None,
+                    json.dumps([_encode(cell) for cell in row],
+                               ensure_ascii=False)))
+                db.executemany('INSERT INTO rhymes VALUES (?, ?, ?)', [
+                    (rhymeid, idx, i) for i, rhymeid in enumerate(
+                        row[poems.header[poems._ref]]) if rhymeid])
+    finally:
+        db.close()
+
+
+def _values(value):
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+def _where(where, settings):
+    """Translate the filters of a selection into SQL conditions."""
+    conditions, args = [], []
+    for key, value in (where or {}).items():
+        values = _values(value)
+        marks = ', '.join('?' * len(values))
+        if key == settings['poem']:
+            conditions += ['poems.title IN ({0})'.format(marks)]
+        elif key == settings['stanza']:
+            conditions += ['stanzas.stanza IN ({0})'.format(marks)]
+        elif key == 'scheme':
+            conditions += ['stanzas.scheme IN ({0})'.format(marks)]
+            values = [''.join(_symbols(x)) for x in values]
+        elif key == settings['ref']:
+            conditions += [
+                'lines.id IN (SELECT line_id FROM rhymes WHERE rhymeid IN '
+                '({0}))'.format(marks)]
+        else:
+            conditions += [
+                'poems.id IN (SELECT poem_id FROM poem_meta WHERE key = ? '
+                'AND value IN ({0}))'.format(marks)]
+            args += [key]
+        args += values
+    return ' AND '.join(conditions) or '1', args
+
+
+def connect(path):
+    """Open a store read-only."""
+    if not os.path.isfile(path):
+        raise IOError('no store found at {0}'.format(path))
+    return sqlite3.connect(
+        pathlib.Path(path).absolute().as_uri() + '?mode=ro', uri=True)
+
+
+def read(path, where=None):
+    """
+    Read the lines of a store which match a selection.
+
+    Parameters
+    ----------
+    where : dict (default=None)
+        Filters on the poem, the stanza, the rhyme ids (using the column
+        names of the collection), the rhyme scheme of the stanzas (`scheme`)
+        or on metadata fields of the poems. Values can be single values or
+        lists of values, of which one must match. All filters must match
+        for a line to be selected.
+
+    Returns
+    -------
+    header, settings, rows, meta : tuple
+        The header of the collection, the names of its columns, the selected
+        rows keyed by their ids and the metadata of the selected poems.
+    """
+    db = connect(path)
+    try:
+        settings = dict(db.execute('SELECT key, value FROM settings'))
+        header, settings = json.loads(settings['header']), json.loads(
+            settings['settings'])
+        condition, args = _where(where, settings)
+        rows, meta = {}, {}
+        for idx, data, title, poem_meta in db.execute(
+                'SELECT lines.id, lines.data, poems.title, poems.meta '
+                'FROM lines JOIN stanzas ON lines.stanza_id = stanzas.id '
+                'JOIN poems ON stanzas.poem_id = poems.id WHERE {0} '
+                'ORDER BY lines.id'.format(condition), args):
+            rows[idx] = json.loads(data)
+            if poem_meta is not None and title not in meta:
+                meta[title] = json.loads(poem_meta)
+    finally:
+        db.close()
+    return header, settings, rows, meta
@@ -0,0 +1,41 @@
+from poepy.poepy import Poems, poepy_path
+from poepy.align import RhymeAligner, align_group
+
+
+def test_align_group():
+    assert align_group([['ai', 't', 'ə', 'n'], ['a', 'n']]) == [
+        ['ai', 't', 'ə', 'n'], ['a', '-', '-', 'n']]
+    alignment = align_group([
+        ['(', 'ʃ', 'p', 'ʁ', ')', 'ai', 't', 'ə', 'n'],
+        ['(', 'b', 'ə', 'd', ')', 'oi', 't', 'ə', 'n']])
+    assert [row.index(')') for row in alignment] == [5, 5]
+    assert align_group([['鳩'], ['洲', '洲']]) == [['鳩', '-'], ['洲', '洲']]
+
+
+def test_RhymeAligner(tmpdir):
+    aligner = RhymeAligner()
+    groups = [[['a', 'n'], ['ai', 't', 'ə', 'n']],
+              [['ai', 't', 'ə', 'n'], ['a', 'n']]]
+    first, second = aligner.align(groups)
+    assert first == second[::-1]
+    assert len(aligner.cache) == 1
+
+
+def test_align_rhymes(tmpdir):
+    cache = str(tmpdir.join('alignments.pkl'))
+    poe = Poems(poepy_path('data', 'Eichendorff1815.tsv'))
+    poe.align_rhymes(workers=2, cache=cache)
+    msa = poe.msa['rhymeids'][1]
+    assert msa['aligned']
+    assert len(set(len(row) for row in msa['alignment'])) == 1
+    idx = msa['ID'][0]
+    assert str(poe._rhyme_tokens(idx, poe[idx, 'rhymeids'].index(1))) == \
+        ' '.join(
+        msa['alignment'][0])
+
+    other = Poems(poepy_path('data', 'Eichendorff1815.tsv'))
+    other.rhyme_aligner = RhymeAligner.load(cache)
+    size = len(other.rhyme_aligner.cache)
+    other.align_rhymes()
+    assert len(other.rhyme_aligner.cache) == size
+    assert other.msa['rhymeids'][1]['alignment'] == msa['alignment']
@@ -0,0 +1,44 @@
+from poepy import Poems
+from poepy.poepy import poepy_path
+from poepy.columns import compact, decompact
+
+
+def test_compact():
+    data = {1: ['a', [0, 1], ['x', '+', 'y']], 2: ['b', [2], ['y']]}
+    store = compact(data, {1: False, 2: True})
+    assert data[1] == ['a', None, None]
+    assert store[1][2] == [2]
+    assert store[2][1].n == [['x'], ['y']]
+    assert store[2].tokens == ['x', '+', 'y']
+    data[2][1] = [3]
+    decompact(data, store)
+    assert data[1][1] == [0, 1] and data[2][1] == [3]
+    assert data[1][2].n == [['x'], ['y']]
+
+
+def test_Poems_compact(capsys):
+    poe = Poems(poepy_path('data', 'CJP.tsv'))
+    rows = {idx: [str(x) for x in poe[idx]] for idx in poe}
+    poe.stats()
+    poe.pprint(*poe.rows[:5])
+    out = capsys.readouterr()[0]
+    poe.compact()
+    assert rows == {idx: [str(x) for x in poe[idx]] for idx in poe}
+    assert poe[2, 'line'].n[0] == ['寬']
+    poe.stats()
+    poe.pprint(*poe.rows[:5])
+    assert capsys.readouterr()[0] == out
+    poe[2, 'rhymeids'] = [0, 0, 0, 2]
+    assert poe[2, 'rhymeids'] == [0, 0, 0, 2]
+
+
+def test_Poems_decompact(tmpdir):
+    poe = Poems(poepy_path('data', 'CJP.tsv'))
+    poe.output('tsv', filename=str(tmpdir.join('plain')))
+    poe.compact()
+    poe.output('tsv', filename=str(tmpdir.join('compact')))
+    assert tmpdir.join('compact.tsv').read_text('utf8') == tmpdir.join(
+        'plain.tsv').read_text('utf8')
+    assert poe._compact and poe._data[2][poe.header['line']] is None
+    assert sorted(poe.decompact()) == ['alignment', 'line', 'rhymeids']
+    assert poe._compact is None and poe._data[2][poe.header['line']]
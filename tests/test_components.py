@@ -0,0 +1,25 @@
+from poepy.poepy import Poems, poepy_path
+from poepy.components import RhymeComponents
+
+
+def test_RhymeComponents():
+    components = RhymeComponents()
+    components.add_group([['a', 'n'], ['o', 'n']])
+    components.add_group([['i'], ['u']])
+    assert len(components) == 2
+    assert components.component('a n') == components.component('o n')
+    assert components.component('a n') != components.component('i')
+    components.add_group([['u'], ['o', 'n']])
+    assert len(components) == 1
+    assert components.component_size('i') == 4
+    assert sorted(components.members('a n')) == ['a n', 'i', 'o n', 'u']
+    assert components.components() == {1: ['a n', 'o n', 'i', 'u']}
+
+
+def test_get_connected_components():
+    import networkx as nx
+    poe = Poems(poepy_path('data', 'Wang1980.tsv'))
+    poe.get_connected_components()
+    poe.get_rhyme_network()
+    assert sorted(sorted(comp) for comp in poe.comps.values()) == sorted(
+        sorted(comp) for comp in nx.connected_components(poe.G))
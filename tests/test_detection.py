@@ -0,0 +1,39 @@
+from poepy import Poems
+from poepy.poepy import poepy_path
+from poepy.detection import line_tail, tail_distances, detect_rhymes
+
+
+def test_tail_distances():
+    tails = [line_tail([['k', 'iu']]), line_tail([['tjiu']]),
+             line_tail([['tək']]), []]
+    assert tails[0] == ['iu', 'k']
+    assert tails[1] == ['u', 'i', 'j']
+    matrix = tail_distances(tails)
+    assert matrix[0, 0] == 0
+    assert matrix[0, 1] == matrix[1, 0] == 1
+    assert matrix[1, 2] == 1
+    assert matrix[2, 3] == 1
+    assert tail_distances([list('uik'), list('uij')])[0, 1] == 1 / 3
+    assert detect_rhymes([list('ab'), list('ab'), list('xy')]) == [1, 1, 0]
+
+
+def test_naive_rhyme_detection():
+    poe = Poems(poepy_path('data', 'CJP.tsv'))
+    poe.naive_rhyme_detection('*', threshold=0.5)
+    assert all(len(poe[idx, 'autorhymeids']) == len(poe[idx, 'line'].n)
+               for idx in poe)
+    result = poe.evaluate(poe, '*', ref='autorhymeids', other_ref='rhymeids')
+    assert 0.99 < result['precision'] <= 1 and 0.75 < result['recall'] < 0.8
+    assert poe.compare(poe, '*', ref='autorhymeids') == result['diffs']
+    exact = [stanza for stanza in poe.rows if stanza not in result['diffs']]
+    assert 'PKU23' in exact
+    partitions = poe.partitions('rhymeids')
+    assert all(poe.partitions('autorhymeids')[stanza] == partitions[stanza]
+               for stanza in exact)
+
+    poe.naive_rhyme_detection(poe.rows[:3])
+    serial = {idx: list(poe[idx, 'autorhymeids']) for idx in poe}
+    poe.naive_rhyme_detection(poe.rows[:3], workers=2)
+    assert {idx: list(poe[idx, 'autorhymeids']) for idx in poe} == serial
+    assert not any(poe[idx, 'autorhymeids'][-1] for idx in poe
+                   if poe[idx, 'stanza'] not in poe.rows[:3])
@@ -0,0 +1,35 @@
+from lingpy.evaluate.acd import _get_bcubed_score
+
+from poepy import Poems
+from poepy.poepy import poepy_path
+from poepy.evaluate import normalize, score, compare_matrix
+
+
+def test_normalize():
+    assert normalize([[0, 5], [0, 0], [3, 5], [5]]) == (1, 2, 3, 1)
+
+
+def test_score():
+    partitionsA = {'1.1': (1, 2, 1, 2), '1.2': (1, 1, 2), '1.3': (1,)}
+    partitionsB = {'1.1': (1, 1, 2, 2), '1.2': (1, 1, 2), '1.3': (1, 2)}
+    results = score(partitionsA, partitionsB, ['1.1', '1.2', '1.3', '2.1'])
+    assert results['missing'] == ['2.1']
+    assert results['unequal'] == ['1.3']
+    assert results['hits'] == 1 and results['count'] == 2
+    assert results['diffs'] == ['1.1']
+    assert results['stanzas']['1.1']['precision'] == _get_bcubed_score(
+        partitionsA['1.1'], partitionsB['1.1'])
+    assert results['stanzas']['1.2']['fscore'] == 1
+
+
+def test_compare(capsys):
+    poe = Poems(poepy_path('data', 'CJP.tsv'))
+    results = poe.evaluate(poe, '*')
+    assert results['fscore'] == 1
+    assert not results['diffs']
+    assert not capsys.readouterr()[0]
+    assert poe.compare(poe, '*') == []
+    assert 'bcubes' in capsys.readouterr()[0]
+    matrix = compare_matrix(poe, poe)
+    assert len(matrix) == 4
+    assert matrix[0, 1]['hits'] == matrix[0, 1]['count']
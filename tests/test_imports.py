@@ -0,0 +1,26 @@
+import re
+import sys
+import subprocess
+
+# budget in microseconds for the cumulative import time of poepy.poem
+BUDGET = 200000
+
+
+def _importtime(statement):
+    out = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        stderr=subprocess.PIPE, universal_newlines=True, check=True).stderr
+    return {m.group(2).strip(): int(m.group(1)) for m in re.finditer(
+        r'import time:\s+\d+ \|\s+(\d+) \|(.*)', out)}
+
+
+def test_import_poem():
+    modules = _importtime('import poepy.poem')
+    assert not {'lingpy', 'networkx', 'tabulate', 'numpy'} & set(modules)
+    assert modules['poepy.poem'] + modules['poepy'] < BUDGET
+
+
+def test_lazy_names():
+    modules = _importtime('import poepy; poepy.Poems')
+    assert 'lingpy' in modules
+    assert 'tabulate' not in modules
@@ -0,0 +1,28 @@
+from poepy import Poems
+from poepy.poepy import poepy_path
+from poepy.lazy import LazyPoems
+
+
+def test_LazyPoems(capsys):
+    lazy = Poems(poepy_path('data', 'CJP.tsv'), lazy=True)
+    assert isinstance(lazy, LazyPoems)
+    poe = Poems(poepy_path('data', 'CJP.tsv'))
+    assert lazy.rows == poe.rows
+    assert len(lazy) == len(poe)
+    for idx in poe:
+        assert [str(x) for x in lazy[idx]] == [str(x) for x in poe[idx]]
+    assert lazy[2, 'rhymeids'] == poe[2, 'rhymeids']
+    assert lazy[2, 'line'].n == poe[2, 'line'].n
+    assert lazy[2, 'line_order'] == 1
+    assert lazy[2, 'nonexisting'] is None
+    assert lazy.stanza_lines(poe.rows[0]) == poe.stanza_lines(poe.rows[0])
+
+    lazy.stats()
+    poe.stats()
+    out = capsys.readouterr()[0].split('\n')
+    assert out[:6] == out[6:12]
+
+    sub = lazy.materialize(lazy.cols[0])
+    assert len(sub) == len(poe.poem_lines(lazy.cols[0]))
+    assert sub[2, 'line_order'] == 1
+    lazy.close()
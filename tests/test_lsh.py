@@ -0,0 +1,28 @@
+import pytest
+
+from poepy.poepy import poepy_path, parser
+from poepy.lsh import RhymeLSH, shingles
+
+
+def test_shingles():
+    assert shingles('s ai s') == {('#', 's'), ('s', 'ai'), ('ai', 's')}
+    assert shingles('kiu', n=3) == {('#', 'u', 'i'), ('u', 'i', 'k')}
+    assert shingles('a', n=3) == {('#', 'a')}
+
+
+def test_RhymeLSH():
+    with pytest.raises(ValueError):
+        RhymeLSH(num_perm=10, bands=3)
+    lsh = RhymeLSH()
+    assert lsh.candidates() == []
+    for idx, word in enumerate(['b ɔ r n', 's k ɔ r n', 'b ɔ r n', 'x']):
+        lsh.add(idx, word)
+    assert lsh.occurrences['b ɔ r n'] == [0, 2]
+    candidates = lsh.candidates(0.3)
+    assert [c[:2] for c in candidates] == [('b ɔ r n', 's k ɔ r n')]
+    assert 0.3 <= candidates[0][2] <= 1
+
+    poe = parser(poepy_path('data', 'dylan.txt'))
+    candidates = poe.get_rhyme_candidates(0.5)
+    assert ('s k ɔ r n', 'b ɔ r n') in [c[:2] for c in candidates]
+    assert poe.rhyme_lsh.occurrences['b ɔ r n']
@@ -0,0 +1,36 @@
+import pytest
+
+from poepy import Poems
+from poepy.poepy import poepy_path
+from poepy.network import RhymeNetwork
+
+
+def test_RhymeNetwork():
+    network = RhymeNetwork()
+    network.add_group([1, 2, 3], [['a', 'n'], ['a', 'n'], ['o', 'n']],
+                      ['1.1', '1.1', '1.1'])
+    network.add_group([7, 9], [['o', 'n'], ['a', 'n']], ['1.2', '1.2'])
+    assert network.nodes == ['a n', 'o n']
+    assert list(network.weights) == [3, 2]
+    assert list(network.occurrences[1]) == [3, 7]
+    assert network.edge_weight(0, 1) == 3
+    assert network.edge_weight(0, 0) == 1
+    G = network.to_networkx()
+    assert G['a n']['o n']['stanza'] == ['1.1', '1.1', '1.2']
+    assert G.nodes['o n']['occurrences'] == ['3', '7']
+
+
+def test_get_rhyme_network():
+    poe = Poems(poepy_path('data', 'CJP.tsv'))
+    poe.get_rhyme_network()
+    for nodeA, nodeB, data in poe.G.edges(data=True):
+        assert len(data['stanza']) == data['weight']
+    poe.get_connected_components()
+    assert sum(len(comp) for comp in poe.comps.values()) == len(poe.G)
+
+    pytest.importorskip('scipy')
+    matrix = poe.rhyme_network.to_csr()
+    assert (matrix != matrix.T).nnz == 0
+    assert matrix.sum() == sum(
+        2 * data['weight'] if a != b else data['weight']
+        for a, b, data in poe.G.edges(data=True))
@@ -1,3 +1,4 @@
+
 from poepy.poem import *
 
 
@@ -30,3 +31,49 @@ def test_parse_word():
     assert poem.author == 'Tester'
     assert poem.meta['freizeit'] == 'no'
     assert poem.year == 'unknown'
+
+
+def test_Line():
+    line = Line.from_text('Es schienen so golden die [a/ʃtɛrnə]Sterne,')
+    assert line['rhymes'][-1] == ['a']
+    assert line.sounds[-1] == ['ʃtɛrnə']
+    assert line.words[-1] == ['Sterne']
+    assert not line.refrain
+    assert not hasattr(line, '__dict__')
+
+
+def test_PoemCollection(tmpdir):
+    from poepy.poepy import poepy_path, parser
+    poems = PoemCollection.from_files(poepy_path('data', 'borges.txt'))
+    assert [poem.title for poem in poems] == ['Ajedrez', 'El enamorado']
+    assert poems[0].stanzas[1][1].original_text.startswith('En su grave')
+
+    for name in ['dylan.txt', 'moustaki.txt', 'rodriguez.txt', 'mey.txt']:
+        poe = PoemCollection.from_files(poepy_path('data', name)).to_poems()
+        parsed = parser(poepy_path('data', name))
+        assert sorted(poe.cols) == sorted(parsed.cols)
+        if name == 'mey.txt':
+            # chords are not analysed by the text format of `Poem`
+            continue
+        for column in ['line', 'alignment', 'stanza', 'rhymeids']:
+            assert [str(poe[idx, column]) for idx in poe] == [
+                str(parsed[idx, column]) for idx in parsed]
+
+    poe = poems.to_poems()
+    assert poe._meta['poems']['Ajedrez']['author'] == 'Jorge Luis Borges'
+    # rhyme ids are unique across the poems of the collection
+    assert len({poe[idx, 'poem'] for msa in poe.msa['rhymeids'].values()
+                for idx in msa['ID'] if len(set(
+                    poe[i, 'poem'] for i in msa['ID'])) > 1}) == 0
+
+    poem = Poem.from_text(
+        "@title: Sterne\n\n"
+        "Es schienen so golden die [a/ʃtɛrnə]Sterne,\n"
+        "Am Fenster ich einsam [b]stand.\n"
+        "Und sah wie in weiter [a/fɛrnə]Ferne.\n"
+        "  Der Ball im Tore ver[b]schwand.\n")
+    poe = poem.to_poems()
+    assert poe[1, 'rhymeids'][-1] == poe[3, 'rhymeids'][-1] == 1
+    assert poe[1, 'alignment'].n[-1] == ['ʃtɛrnə']
+    assert poe[4, 'alignment'].n[-1] == ['ver', 'schwand']
+    assert poe[4, 'refrain'] == 'R'
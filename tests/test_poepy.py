@@ -1,5 +1,12 @@
+import os
+import shutil
+
+import pytest
+
 from poepy import Poems
-from poepy.poepy import poepy_path
+from poepy.poepy import poepy_path, parser, iter_poems, is_chinese, \
+    parse_line, _split_chinese
+from poepy.network import RhymeNetwork
 
 
 def test_Poems(tmpdir, capsys):
@@ -7,4 +14,228 @@ def test_Poems(tmpdir, capsys):
     poe.stats()
     out, _ = capsys.readouterr()
     assert 'Stanzas' in out
-    #assert poe.songbook('*', filename=str(tmpdir.join('test.tex')))
\ No newline at end of file
+    #assert poe.songbook('*', filename=str(tmpdir.join('test.tex')))
+
+
+def test_iter_poems():
+    poems = list(iter_poems(poepy_path('data', 'dylan.txt')))
+    assert poems[0][0] == 'I want you'
+    assert poems[0][1]['author'] == 'Bob Dylan'
+    poe = parser(poepy_path('data', 'dylan.txt'))
+    assert len(poe) == sum(len(rows) for _, _, rows in poems)
+    assert list(poe._meta['poems']) == [title for title, meta, _ in poems
+                                        if meta is not None]
+
+
+def test_from_directory(tmpdir):
+    for name in ['dylan.txt', 'moustaki.txt']:
+        tmpdir.join(name).write_text(
+            open(poepy_path('data', name), encoding='utf8').read(), 'utf8')
+    poe = Poems.from_directory(str(tmpdir))
+    assert len(poe._meta['poems']) == 3
+    assert len(poe) == sum(
+        len(parser(poepy_path('data', name))) for name in
+        ['dylan.txt', 'moustaki.txt'])
+    # rhyme ids must not be shared across poems
+    poems = {}
+    for idx in poe:
+        for rhymeid in poe[idx, 'rhymeids']:
+            if rhymeid:
+                poems.setdefault(rhymeid, set()).add(poe[idx, 'poem'])
+    assert max(len(v) for v in poems.values()) == 1
+    poe2 = Poems.from_directory(str(tmpdir), workers=2)
+    assert [poe[idx] for idx in poe] == [poe2[idx] for idx in poe2]
+
+
+def test_from_directory_titles(tmpdir):
+    for name in ['a.txt', 'b.txt']:
+        tmpdir.join(name).write_text(
+            '@title: Intro\n@author: {0}\n\n[a]one\n[a]two\n'.format(name),
+            'utf8')
+    poe = Poems.from_directory(str(tmpdir))
+    assert poe.cols == ['Intro', 'Intro (2)']
+    assert poe.stanza_lines('2.1') == poe.poem_lines('Intro (2)')
+    assert poe._meta['poems']['Intro']['author'] == 'a.txt'
+    assert poe._meta['poems']['Intro (2)']['author'] == 'b.txt'
+
+
+def test_incremental(tmpdir):
+    for name in ['dylan.txt', 'leto.txt']:
+        shutil.copy(poepy_path('data', name), str(tmpdir.join(name)))
+    full = Poems.from_directory(str(tmpdir))
+    title, meta, rows = list(iter_poems(str(tmpdir.join('leto.txt'))))[0]
+    os.remove(str(tmpdir.join('leto.txt')))
+    poe = Poems.from_directory(str(tmpdir))
+    poe.get_rhyme_network()
+    poe.get_connected_components()
+
+    poe.add_poem(title, meta, rows)
+    full.get_rhyme_network()
+    full.get_connected_components()
+    assert [poe[idx] for idx in poe] == [full[idx] for idx in full]
+    assert poe.rows == full.rows and poe.cols == full.cols
+    assert {k: v['ID'] for k, v in poe.msa['rhymeids'].items()} == {
+        k: v['ID'] for k, v in full.msa['rhymeids'].items()}
+    assert (poe._array == full._array).all()
+    assert poe._poem_index == full._poem_index
+    assert poe._meta['poems'] == full._meta['poems']
+    assert sorted(poe.G.edges(data=True)) == sorted(full.G.edges(data=True))
+    assert sorted(map(sorted, poe.comps.values())) == sorted(
+        map(sorted, full.comps.values()))
+    with pytest.raises(ValueError):
+        poe.add_poem(title, meta, rows)
+
+    poe.remove_poem(title)
+    assert title not in poe.cols and title not in poe._meta['poems']
+    assert len(poe) == len(parser(poepy_path('data', 'dylan.txt')))
+    assert poe.partitions() == parser(
+        poepy_path('data', 'dylan.txt')).partitions()
+    G = RhymeNetwork.from_poems(poe).to_networkx()
+    assert sorted(poe.G.nodes(data=True)) == sorted(G.nodes(data=True))
+    assert sorted(poe.G.edges(data=True)) == sorted(G.edges(data=True))
+
+    stanza = poe.rows[0]
+    old = poe.stanza_lines(stanza)
+    rows = [{c: poe[idx, c] for c in poe.columns} for idx in old]
+    rows[0]['rhymeids'] = [0 for x in rows[0]['rhymeids']]
+    rows.append({'line': 'a + new + line', 'alignment': 'a + new + l ai n',
+                 'rhymeids': [0, 0, poe[old[1], 'rhymeids'][-1]]})
+    poe.update_stanza(stanza, rows)
+    assert poe.stanza_lines(stanza)[:-1] == old
+    fresh = Poems({0: list(poe.columns), **{idx: list(poe[idx]) for idx in
+                                            poe}})
+    assert {k: v['ID'] for k, v in poe.msa['rhymeids'].items()} == {
+        k: v['ID'] for k, v in fresh.msa['rhymeids'].items()}
+    assert (poe._array == fresh._array).all()
+    assert poe.partitions() == fresh.partitions()
+
+
+def test_tokenizer():
+    assert is_chinese('你問')
+    assert not is_chinese('你a')
+    assert not is_chinese('')
+    assert _split_chinese('你問我愛你有多[a/sh_ēn]深') == [
+        '你', '問', '我', '愛', '你', '有', '多', '[a/sh_ēn]深']
+    rhymeids, alignment, words, chords = parse_line(
+        ['[a/s_ai_s]sighs!', 'I/G/wa/C/nt'], {0: 0})
+    assert rhymeids == [1, 0]
+    assert alignment == ['s ai s', 'i wa nt']
+    assert words == ['sighs!', 'I wa nt']
+    assert chords == ['_', '_ G C']
+    # brackets in the wrong order are kept
+    assert parse_line([']/_G[[', ']a[b]', '[f/:wEit]ing'], {0: 0})[2] == [
+        ']/_G[[', ']a[b]', 'ing']
+
+
+def test_line_index():
+    poe = Poems(poepy_path('data', 'Wang1980.tsv'))
+    idxs = poe.stanza_lines('1.1')
+    assert idxs == sorted(poe.get_list(row='1.1', flat=True),
+                          key=lambda x: poe[x, 'line_order'])
+    assert poe.poem_lines(poe[idxs[0], 'poem'])[:len(idxs)] == idxs
+    del poe._data[idxs[0]]
+    assert poe.stanza_lines('1.1') == idxs[1:]
+
+    poe[idxs[1], 'line_order'] = 99
+    assert poe.stanza_lines('1.1') == idxs[2:] + idxs[1:2]
+    partitions = poe.partitions()
+    poe[idxs[1], 'stanza'] = '1.2'
+    assert idxs[1] not in poe.stanza_lines('1.1')
+    assert poe.stanza_lines('1.2')[-1] == idxs[1]
+    assert poe.partitions() != partitions
+
+
+def test_cache(tmpdir):
+    path = str(tmpdir.join('CJP.tsv'))
+    shutil.copy(poepy_path('data', 'CJP.tsv'), path)
+    poe = Poems.load_cached(path)
+    assert os.path.exists(path + '.poepy.pkl')
+    cached = Poems.load_cached(path)
+    assert [str(x) for x in cached[2]] == [str(x) for x in poe[2]]
+    assert cached[2, 'line'].n == poe[2, 'line'].n
+    assert sorted(cached.msa['rhymeids']) == sorted(poe.msa['rhymeids'])
+    assert (cached._array == poe._array).all()
+    assert cached.stanza_lines(cached.rows[0]) == poe.stanza_lines(poe.rows[0])
+
+    # touching the file invalidates the cache, which is written anew
+    os.utime(path + '.poepy.pkl', (0, 0))
+    Poems.load_cached(path)
+    assert os.path.getmtime(path + '.poepy.pkl') == 0
+    os.utime(path, (0, 0))
+    Poems.load_cached(path)
+    assert os.path.getmtime(path + '.poepy.pkl') != 0
+
+
+def test_html(tmpdir):
+    poe = parser(poepy_path('data', 'dylan.txt'))
+    poe.html('*', filename=str(tmpdir.join('stream.html')), alignment=True,
+             chords=True, stream=True)
+    text = tmpdir.join('stream.html').read_text('utf8')
+    assert text.count('<tr>') == len(poe) * 2 + len(poe.rows)
+    assert 'background-color' in text
+
+    poe = parser(poepy_path('data', 'moustaki.txt'))
+
+    poe.html('*', filename=str(tmpdir.join('poems.html')), pages='poem')
+    index = tmpdir.join('poems.html').read_text('utf8')
+    assert index.count('<li>') == len(poe.cols)
+    assert tmpdir.join('poems-2.html').check()
+    poe.html('*', filename=str(tmpdir.join('pages.html')), pages=3)
+    assert tmpdir.join('pages.html').read_text('utf8').count('<li>') == \
+        len(range(0, len(poe.rows), 3))
+
+
+def test_songbook(tmpdir):
+    poe = parser(poepy_path('data', 'moustaki.txt'))
+    poe.songbook('*', filename=str(tmpdir.join('songs.tex')))
+    text = tmpdir.join('songs.tex').read_text('utf8')
+    assert text.count(r'\begin{song}') == 2
+    poe.songbook('*', filename=str(tmpdir.join('songs2.tex')), workers=2)
+    assert tmpdir.join('songs2.tex').read_text('utf8') == text
+
+    poe.songbook('*', filename=str(tmpdir.join('split.tex')), split=True)
+    main = tmpdir.join('split.tex').read_text('utf8')
+    assert main.count(r'\input{split/') == 2
+    files = sorted(tmpdir.join('split').listdir(lambda p: p.ext == '.tex'))
+    assert ''.join(f.read_text('utf8') for f in sorted(
+        files, key=lambda f: main.index(f.purebasename))) == text
+    for f in files:
+        f.setmtime(0)
+    poe.songbook('*', filename=str(tmpdir.join('split.tex')), split=True)
+    assert all(f.mtime() == 0 for f in files)
+
+
+def _text_rows(poe):
+    return sorted(
+        [str(poe[idx, column]) for column in (
+            'poem', 'stanza', 'line', 'alignment', 'rhymeids', 'refrain',
+            'chords')] for idx in poe)
+
+
+@pytest.mark.parametrize('name', sorted(
+    f for f in os.listdir(poepy_path('data')) if f.endswith('.txt')))
+def test_text(tmpdir, name):
+    poe = parser(poepy_path('data', name))
+    poe.text(str(tmpdir.join('out.txt')))
+    out = parser(str(tmpdir.join('out.txt')))
+    assert _text_rows(out) == _text_rows(poe)
+    assert out._meta['poems'] == poe._meta['poems']
+    out.text(str(tmpdir.join('again.txt')))
+    assert tmpdir.join('again.txt').read_text('utf8') == \
+        tmpdir.join('out.txt').read_text('utf8')
+
+
+def test_text_collection(tmpdir):
+    poe = Poems(poepy_path('data', 'Wang1980.tsv'))
+    poe.text(str(tmpdir.join('wang.txt')))
+    text = tmpdir.join('wang.txt').read_text('utf8')
+    assert text.count('@title: ') == len(poe.cols)
+    poe.text(str(tmpdir.join('wang2.txt')), workers=2)
+    assert tmpdir.join('wang2.txt').read_text('utf8') == text
+    out = parser(str(tmpdir.join('wang.txt')))
+    assert sorted(out.cols) == sorted(poe.cols)
+
+    poe.text(str(tmpdir.join('split.txt')), '關睢', '卷耳', split=True)
+    files = tmpdir.join('split').listdir()
+    assert len(files) == 2
+    assert any('[a/kiu]鳩' in f.read_text('utf8') for f in files)
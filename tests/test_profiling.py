@@ -0,0 +1,90 @@
+import os
+import shutil
+
+from poepy import profiling
+from poepy.poepy import Poems, poepy_path, parser
+
+
+def test_profiled(tmpdir):
+    poe = parser(poepy_path('data', 'dylan.txt'))
+    assert profiling.results() == {}
+
+    with profiling.profiled(profile_dir=str(tmpdir.join('prof'))):
+        poe = parser(poepy_path('data', 'dylan.txt'))
+        poe.get_rhyme_network()
+        poe.html('*', filename=str(tmpdir.join('dylan.html')))
+    assert not profiling.is_enabled()
+    results = profiling.results()
+    assert results['parser'] == {
+        'calls': 1, 'seconds': results['parser']['seconds'],
+        'items': len(poe)}
+    assert results['parse_line']['calls'] == len(poe)
+    assert results['Poems.__init__']['seconds'] <= results['parser']['seconds']
+    assert results['html']['items'] == len(poe.rows)
+    assert 'get_rhyme_network' in profiling.report()
+    assert sorted(name.split('-')[0] for name in os.listdir(
+        str(tmpdir.join('prof')))) == ['get_rhyme_network', 'html', 'parser']
+
+
+def test_workers(tmpdir):
+    for name in ['dylan.txt', 'leto.txt']:
+        shutil.copy(poepy_path('data', name), str(tmpdir.join(name)))
+    with profiling.profiled():
+        poe = Poems.from_directory(str(tmpdir), workers=2)
+    assert profiling.results()['parse_line']['calls'] == len(poe)
+    profiling.reset()
+    assert profiling.results() == {}
+
+
+def test_positional_arguments(tmpdir):
+    poe = parser(poepy_path('data', 'borges.txt'))
+    poem, other = poe.cols
+    with profiling.profiled():
+        poe.get_rhyme_network('rhymeids')
+        edges = len(poe.rhyme_network.edges)
+        poe.get_connected_components('rhymeids')
+        poe.remove_poem(other)
+        poe.align_rhymes(1)
+        poe.pprint('*', chords=False)
+        poe.text(str(tmpdir.join('out.txt')), poem, workers=1)
+        poe.to_sqlite(str(tmpdir.join('poems.sqlite')))
+        out = Poems.from_sqlite(str(tmpdir.join('poems.sqlite')), {
+            'poem': poem})
+    results = profiling.results()
+    assert results['get_rhyme_network']['items'] == edges
+    assert results['get_connected_components']['calls'] == 2
+    assert results['get_connected_components']['items'] > len(poe.comps)
+    assert results['align_rhymes']['items'] == len(poe.msa['rhymeids'])
+    assert results['pprint']['items'] == len(poe.rows)
+    assert results['text']['items'] == 1
+    assert results['to_sqlite']['items'] == len(poe)
+    assert results['from_sqlite']['items'] == len(out) == len(poe)
+
+
+def test_failing_items():
+    def broken(result, *args):
+        raise ValueError(args)
+
+    @profiling.stage('broken', items=broken)
+    def double(value, factor=2):
+        return value * factor
+
+    with profiling.profiled():
+        assert double(2, factor=3) == 6
+    assert profiling.results()['broken'] == {
+        'calls': 1, 'seconds': profiling.results()['broken']['seconds'],
+        'items': 0}
+
+
+def test_keyword_arguments(caplog):
+    with profiling.profiled():
+        poe = Poems(poepy_path('data', 'CJP.tsv'), ref='rhymeids')
+        poe.get_rhyme_network(ref='rhymeids')
+        poe.evaluate(poe, '*', ref='rhymeids', other_ref='rhymeids')
+        parser(filename=poepy_path('data', 'dylan.txt'))
+    assert not [record for record in caplog.records if
+                record.name == 'poepy.profiling']
+    results = profiling.results()
+    for name in ['Poems.__init__', 'add_alignments', 'get_rhyme_network',
+                 'evaluate', 'parser']:
+        assert results[name]['items'] > 0
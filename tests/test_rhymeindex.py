@@ -0,0 +1,27 @@
+from poepy.poepy import poepy_path, parser
+from poepy.rhymeindex import RhymeIndex, segments
+
+
+def test_segments():
+    assert segments('kiu') == ['k', 'i', 'u']
+    assert segments('s ai s') == ['s', 'ai', 's']
+
+
+def test_RhymeIndex(tmpdir):
+    poe = parser(poepy_path('data', 'dylan.txt'))
+    poe.get_rhyme_index()
+    index = poe.rhyme_index
+    assert index.occurrences_of('s ai s') == [('I want you', '1.1', 1)]
+    assert index.occurrences_of(['s', 'ai', 's']) == [('I want you', '1.1', 1)]
+    assert index.occurrences_of('x') == []
+    assert set(index.tails('s ai s', 2)) == {'s ai s', 'k r ai s'}
+    assert 's ai s' in index.tails('k r ai s', 1)
+    assert index.tails('q q', 2) == []
+    partners = dict(index.partners_of('s ai s'))
+    assert partners['k r ai s'] == 1
+    assert 's æi' in partners
+
+    index.save(str(tmpdir.join('index.pkl')))
+    loaded = RhymeIndex.load(str(tmpdir.join('index.pkl')))
+    assert loaded.partners_of('s ai s') == index.partners_of('s ai s')
+    assert loaded.tails('s ai s', 2) == index.tails('s ai s', 2)
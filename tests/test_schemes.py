@@ -0,0 +1,48 @@
+from poepy import Poems
+from poepy.poepy import poepy_path, parser
+from poepy.schemes import SchemeIndex, scheme, _symbols
+
+
+def test_scheme():
+    assert ''.join(scheme([([0, 3], ''), ([5], ''), ([0, 3], ''),
+                           ([5], '')])) == 'ABAB'
+    assert scheme([([0], 'R'), ([1, 2], ''), ([2], 'R')]) == (
+        "x'", '(AB)', "B'")
+    assert _symbols("x'(AB)B'") == ("x'", '(AB)', "B'")
+    assert scheme([([i], '') for i in range(1, 29)])[-3:] == (
+        'Z', 'AA', 'AB')
+
+
+def test_SchemeIndex(tmpdir):
+    poe = Poems(poepy_path('data', 'Wang1980.tsv'))
+    stanzas = poe.find_stanzas('ABAB')
+    assert stanzas
+    assert all(poe.scheme_index.schemes[stanza] == 'ABAB' for stanza in
+               stanzas)
+    assert set(stanzas) <= set(poe.find_stanzas('AB', prefix=True))
+    poem = poe[poe.stanza_lines(stanzas[0])[0], 'poem']
+    selected = poe.find_stanzas('ABAB', poems=[poem])
+    assert stanzas[0] in selected
+    assert selected == [stanza for stanza in stanzas if poe[
+        poe.stanza_lines(stanza)[0], 'poem'] == poem]
+    index = poe.scheme_index
+    poe.find_stanzas('AABB')
+    assert poe.scheme_index is index
+
+    index.save(str(tmpdir.join('schemes.pkl')))
+    loaded = SchemeIndex.load(str(tmpdir.join('schemes.pkl')))
+    assert loaded.find('ABAB') == stanzas
+    assert loaded.counts() == index.counts()
+
+
+def test_find_stanzas(tmpdir):
+    poe = parser(poepy_path('data', 'dylan.txt'))
+    stanzas = poe.find_stanzas('AAABCCCB', where={'author': 'Bob Dylan'})
+    assert len(stanzas) == 3
+    assert poe.find_stanzas('AAABCCCB', where={'author': 'Eminem'}) == []
+    assert len(poe.find_stanzas("x'", prefix=True)) == 4
+
+    path = str(tmpdir.join('dylan.db'))
+    poe.to_sqlite(path)
+    out = Poems.from_sqlite(path, where={'scheme': 'AAABCCCB'})
+    assert sorted(out.rows) == sorted(stanzas)
@@ -0,0 +1,48 @@
+from poepy import Poems
+from poepy.poepy import poepy_path, parser, iter_poems
+
+
+def test_statistics():
+    poe = Poems(poepy_path('data', 'CJP.tsv'))
+    stats = poe.statistics()
+    assert stats['rhymes'] == len(poe.msa['rhymeids'])
+    assert stats['rhyme_words'] == sum(
+        len(msa['ID']) for msa in poe.msa['rhymeids'].values())
+    assert sum(k * v for k, v in stats['group_sizes'].items()) == \
+        stats['rhyme_words']
+    assert sum(stats['rhyme_words_per_stanza'].values()) == len(poe.rows)
+    assert sum(stats['lines_per_poem'].values()) == len(poe)
+    assert poe.statistics() is not stats
+    cached = poe._statistics
+    poe.statistics(poe.cols[0])
+    assert poe._statistics is cached
+    poe.compact()
+    poe._statistics = None
+    assert poe.statistics() == stats
+
+    words = len([x for x in poe[2, 'rhymeids'] if x])
+    poe[2, 'rhymeids'] = [0] * len(poe[2, 'rhymeids'])
+    assert poe.statistics()['rhyme_words'] <= stats['rhyme_words'] - words
+
+
+def test_statistics_subsets():
+    poe = parser(poepy_path('data', 'moustaki.txt'))
+    stats = poe.statistics('Ma solitude')
+    assert stats['poems'] == 1
+    assert stats == poe.statistics(where={'title': 'Ma solitude'})
+    assert poe.statistics(where={'author': 'Nobody'})['lines'] == 0
+    by = poe.statistics(by='author')
+    assert list(by) == ['Georges Moustaki']
+    assert by['Georges Moustaki']['lines'] == len(poe)
+    records = poe._statistics[1].table(where={'title': 'Ma solitude'})
+    assert records[0]['lines'] == stats['lines']
+    assert records[0]['author'] == 'Georges Moustaki'
+
+    poe = parser(poepy_path('data', 'mey.txt'))
+    assert 0 < poe.statistics()['chord_coverage'] <= 1
+    poe = parser(poepy_path('data', 'dylan.txt'))
+    lines = poe.statistics()['lines']
+    title, meta, rows = list(iter_poems(poepy_path('data', 'leto.txt')))[0]
+    poe.add_poem(title, meta, rows)
+    assert poe.statistics()['lines'] == lines + len(rows)
+    assert poe.statistics(by='title')[title]['lines'] == len(rows)
@@ -0,0 +1,45 @@
+import pytest
+
+from poepy.poepy import Poems, poepy_path, parser
+from poepy import store
+
+
+def test_sqlite(tmpdir):
+    path = str(tmpdir.join('poems.db'))
+    poe = parser(poepy_path('data', 'moustaki.txt'))
+    poe.to_sqlite(path)
+    out = Poems.from_sqlite(path)
+    assert sorted(out.cols) == sorted(poe.cols)
+    assert all(str(out[idx]) == str(poe[idx]) for idx in poe)
+    assert out._meta['poems'] == poe._meta['poems']
+
+    out = Poems.from_sqlite(path, where={'poem': 'Ma solitude'})
+    assert out.cols == ['Ma solitude']
+    assert list(out._meta['poems']) == ['Ma solitude']
+    assert len(out) == len(poe.poem_lines('Ma solitude'))
+    out = Poems.from_sqlite(path, where={'author': 'Georges Moustaki'})
+    assert len(out) == len(poe)
+
+    with pytest.raises(ValueError):
+        Poems.from_sqlite(path, where={'author': 'Bob Dylan'})
+
+    # readers only take shared locks
+    db = store.connect(path)
+    assert db.execute('SELECT COUNT(*) FROM lines').fetchone()[0] == len(poe)
+    assert len(Poems.from_sqlite(path, where={'stanza': '1.1'})) == 4
+    db.close()
+
+
+def test_sqlite_tsv(tmpdir):
+    path = str(tmpdir.join('wang.db'))
+    poe = Poems(poepy_path('data', 'Wang1980.tsv'))
+    poe.to_sqlite(path)
+    poe.to_sqlite(path)
+    out = Poems.from_sqlite(path, where={'poem': ['關睢', '葛覃']})
+    assert sorted(out.cols) == sorted(['關睢', '葛覃'])
+    assert all(str(out[idx]) == str(poe[idx]) for idx in out)
+
+    out = Poems.from_sqlite(path, where={'rhymeids': 1, 'poem': '關睢'})
+    assert len(out) == 3
+    assert all(1 in out[idx, 'rhymeids'] for idx in out)
+    assert len(out.msa['rhymeids'][1]['seqs']) == 3